@@ -0,0 +1,216 @@
+'''
+Content-addressed cache of backtest run results on local disk.
+
+A run is keyed by run_fingerprint(): a digest of the data in its input
+EventStores, the code of the strategy, portfolio and execution classes,
+the run parameters and the engine version. Changing any of them changes the key, so stale entries are
+never returned, they just age out. Inputs that cannot be identified by
+content make the run uncacheable rather than risk a wrong hit. Entries are pickled, one file per key, and the
+least recently used ones are evicted once the cache grows over max_bytes.
+'''
+import logging
+import os
+import pickle
+import tempfile
+from typing import Any, Callable, Mapping, TypeVar
+
+from anvil import __version__
+from anvil.event_processing import EventStore
+from anvil.fingerprint import digest
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+DEFAULT_MAX_BYTES = 1 << 30
+
+
+def default_cache_dir() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base, 'anvil', 'results')
+
+
+def _class_digest(role: str, cls: type) -> str | None:
+    '''
+    Digest of the code of the class and its bases as loaded in this
+    process, so that editing it, or defining another class of the same
+    name in a notebook, changes the key
+    '''
+    class_digest = digest(cls)
+    if class_digest is None:
+        logger.warning(
+            'class cannot be fingerprinted, run is not cacheable',
+            extra={'role': role, 'class': cls.__qualname__},
+        )
+    return class_digest
+
+
+def run_fingerprint(
+        event_stores: list[EventStore],
+        strategy_cls: type,
+        portfolio_cls: type,
+        execution_cls: type,
+        params: Mapping[str, Any],
+        engine_version: str = __version__,
+) -> str | None:
+    '''
+    Returns the cache key of a run, or None when one of the stores cannot
+    fingerprint its data, or a class or a param cannot be digested (see
+    anvil.fingerprint), in which case the run must not be cached.
+
+    Classes are identified by the code loaded in this process, not by the
+    source files on disk. A module edited but not reloaded therefore keys
+    the code that actually runs, and the key changes once it is reloaded.
+
+    params should hold everything else that changes the outcome, e.g. the
+    strategy parameters and the time window. Scalars, dates, containers,
+    dataclasses, numpy arrays and functions are supported, arbitrary
+    objects are not.
+    '''
+    store_digests: list[str] = []
+    for store in event_stores:
+        store_digest = store.fingerprint()
+        if store_digest is None:
+            logger.warning(
+                'event store cannot be fingerprinted, run is not cacheable',
+                extra={'store': store.name()},
+            )
+            return None
+        store_digests.append(store_digest)
+
+    class_digests: list[str] = []
+    for role, cls in [
+        ('strategy', strategy_cls),
+        ('portfolio', portfolio_cls),
+        ('execution', execution_cls),
+    ]:
+        class_digest = _class_digest(role, cls)
+        if class_digest is None:
+            return None
+        class_digests.append(class_digest)
+
+    params_digest = digest(dict(params))
+    if params_digest is None:
+        logger.warning(
+            'params cannot be fingerprinted, run is not cacheable',
+            extra={'params': sorted(params)},
+        )
+        return None
+
+    return digest(engine_version, class_digests, params_digest, store_digests)
+
+
+class ResultCache(object):
+    '''
+    On-disk LRU cache of run results keyed by run_fingerprint().
+
+    Pass enabled=False to bypass it entirely, or refresh=True to
+    get_or_run() to recompute and overwrite a single entry.
+    '''
+    SUFFIX = '.pkl'
+
+    def __init__(
+            self,
+            directory: str | None = None,
+            max_bytes: int = DEFAULT_MAX_BYTES,
+            enabled: bool = True,
+    ):
+        self._directory = directory or default_cache_dir()
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        if enabled:
+            os.makedirs(self._directory, exist_ok=True)
+
+    def get_or_run(
+            self,
+            key: str | None,
+            run: Callable[[], T],
+            refresh: bool = False,
+    ) -> T:
+        if not self._enabled or key is None:
+            return run()
+
+        if not refresh:
+            found, value = self._load(key)
+            if found:
+                return value
+
+        value = run()
+        self.put(key, value)
+        return value
+
+    def get(self, key: str) -> Any | None:
+        _, value = self._load(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        if not self._enabled:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # atomic, concurrent readers never see a partial entry
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def __contains__(self, key: str) -> bool:
+        return self._enabled and os.path.exists(self._path(key))
+
+    def size_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            os.unlink(path)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + self.SUFFIX)
+
+    def _load(self, key: str) -> tuple[bool, Any]:
+        if not self._enabled:
+            return False, None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            # written by an incompatible version, treat as a miss
+            logger.warning('dropping unreadable cache entry', extra={'key': key})
+            os.unlink(path)
+            return False, None
+
+        # the modification time doubles as the last access time
+        os.utime(path)
+        logger.debug('result cache hit', extra={'key': key})
+        return True, value
+
+    def _entries(self) -> list[tuple[str, float, int]]:
+        entries: list[tuple[str, float, int]] = []
+        with os.scandir(self._directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self.SUFFIX):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, _, size in entries)
+        if total <= self._max_bytes:
+            return
+        # least recently used first
+        for path, _, size in sorted(entries, key=lambda e: e[1]):
+            if total <= self._max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.debug('evicted cache entry', extra={'path': path})
@@ -1,8 +1,20 @@
 
 
 from abc import ABC, abstractmethod
-from anvil.event_processing import EventProcessor
-from anvil.events import Event, FillEvent, OrderEvent, SignalEvent
+from dataclasses import dataclass
+from typing import Callable
+import logging
+
+from anvil.event_processing import EventProcessor, EventScheduler
+from anvil.events import (
+    Event,
+    FillEvent,
+    InternalSchedulingEvent,
+    OrderEvent,
+    SignalEvent,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class Strategy(ABC):
@@ -55,3 +67,139 @@ class MbteProcessor(EventProcessor):
 
         # trade the order out        
         self._execution.receive(order)
+
+
+@dataclass(frozen=True)
+class FanOutScheduledEvent(InternalSchedulingEvent):
+    '''
+    Wraps an event scheduled by one member of a FanOutProcessor so that it
+    is delivered back to that member only. schedule_id is the id the member
+    got from its scheduler.
+    '''
+    member: int
+    schedule_id: int
+    event: InternalSchedulingEvent
+
+
+class _MemberScheduler(EventScheduler):
+    '''
+    Schedules on behalf of one member, which can only cancel the events it
+    scheduled itself.
+
+    The member gets ids of its own, mapped to the ids of the underlying
+    scheduler until the event is delivered or cancelled, so only the
+    events still pending are tracked.
+    '''
+    def __init__(self, scheduler: EventScheduler, member: int):
+        self._scheduler = scheduler
+        self._member = member
+        self._next_id = 0
+        self._pending: dict[int, int] = {}
+
+    def schedule(self, internal_event: InternalSchedulingEvent) -> int:
+        schedule_id = self._next_id
+        self._next_id += 1
+        self._pending[schedule_id] = self._scheduler.schedule(FanOutScheduledEvent(
+            timestamp=internal_event.timestamp,
+            symbol=internal_event.symbol,
+            member=self._member,
+            schedule_id=schedule_id,
+            event=internal_event,
+        ))
+        return schedule_id
+
+    def cancel(self, schedule_id: int) -> bool:
+        scheduled = self._pending.pop(schedule_id, None)
+        if scheduled is None:
+            return False
+        return self._scheduler.cancel(scheduled)
+
+    def delivered(self, schedule_id: int) -> None:
+        self._pending.pop(schedule_id, None)
+
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+
+# builds the strategy, portfolio and execution of one member, wired to the
+# scheduler that keeps its scheduled events to itself
+MemberBuilder = Callable[[EventScheduler], tuple[Strategy, Portfolio, Execution]]
+
+
+class FanOutProcessor(EventProcessor):
+    '''
+    Runs many Strategy/Portfolio/Execution triples on a single replay pass.
+
+    The EventSequencer decodes, merges and clocks the event stream once and
+    every member sees each event in turn. Each member keeps its own
+    portfolio and execution, so results stay separate, and events it
+    schedules through the scheduler given to its builder come back to it
+    alone.
+
+    Members that schedule events must be registered with add_member() and
+    use the scheduler it passes to the builder. add() is for members that
+    never schedule. An InternalSchedulingEvent scheduled directly on the
+    sequencer has no owner and is rejected with a ValueError rather than
+    being delivered to every member.
+
+    With isolate_errors, a member that raises is logged and dropped from
+    the rest of the run instead of aborting every other member.
+    '''
+    def __init__(self, scheduler: EventScheduler, isolate_errors: bool = False):
+        self._scheduler = scheduler
+        self._isolate_errors = isolate_errors
+        self._members: list[MbteProcessor] = []
+        self._schedulers: list[_MemberScheduler] = []
+        self._active: list[int] = []
+        self._errors: dict[int, Exception] = {}
+
+    def add(
+            self,
+            strategy: Strategy,
+            portfolio: Portfolio,
+            execution: Execution,
+    ) -> int:
+        return self.add_member(lambda _: (strategy, portfolio, execution))
+
+    def add_member(self, build: MemberBuilder) -> int:
+        member = len(self._members)
+        scheduler = _MemberScheduler(self._scheduler, member)
+        strategy, portfolio, execution = build(scheduler)
+        self._members.append(MbteProcessor(strategy, portfolio, execution))
+        self._schedulers.append(scheduler)
+        self._active.append(member)
+        return member
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def errors(self) -> dict[int, Exception]:
+        return dict(self._errors)
+
+    def process(self, event: Event) -> None:
+        if isinstance(event, FanOutScheduledEvent):
+            self._schedulers[event.member].delivered(event.schedule_id)
+            if event.member not in self._errors:
+                self._deliver(event.member, event.event)
+        elif isinstance(event, InternalSchedulingEvent):
+            raise ValueError(
+                f'{type(event).__name__} was not scheduled through a member '
+                'scheduler, register members that schedule with add_member()'
+            )
+        else:
+            for member in self._active:
+                self._deliver(member, event)
+
+        # drop members that failed on this event
+        if len(self._active) + len(self._errors) > len(self._members):
+            self._active = [m for m in self._active if m not in self._errors]
+
+    def _deliver(self, member: int, event: Event) -> None:
+        if not self._isolate_errors:
+            self._members[member].process(event)
+            return
+        try:
+            self._members[member].process(event)
+        except Exception as e:
+            logger.exception('dropping failed member', extra={'member': member})
+            self._errors[member] = e
@@ -88,6 +88,30 @@ class EventStore(ABC):
         '''
         pass
 
+    def seek(self, timestamp: datetime) -> None:
+        '''
+        Position the store so that the next event is the first one whose
+        timestamp is at or after the given timestamp.
+
+        The default implementation pops events one by one, so it can only
+        move forward and costs as much as the events it skips. Stores that
+        can index their data (array or file backed) should override it.
+
+        :param timestamp: the earliest timestamp to be replayed
+        '''
+        head = self.peek()
+        while head is not None and head.timestamp < timestamp:
+            self.pop()
+            head = self.peek()
+
+    def fingerprint(self) -> str | None:
+        '''
+        A digest of the events this store replays, used to key cached run
+        results. Stores that cannot cheaply describe their content return
+        None and runs using them are not cached.
+        '''
+        return None
+
 
 class EventProcessor(ABC):
     @abstractmethod
@@ -150,16 +174,28 @@ class EventSequencer(EventScheduler):
     It uses an algorithm that does a k-way merge of sorted data streams. 
     Each EventStore can lazily propose the next event to be inserted into a
     priority queue that  
+
+    Time window:
+    An optional half-open window [start, end) restricts the run. Each
+    EventStore is seeked to start before the merge queue is built, and the
+    run stops at the first event at or after end, scheduled events included.
     '''
     
     def __init__(
             self,
             sim_clock: SimulationClock, 
             event_stores: list[EventStore], 
+            start: datetime | None = None,
+            end: datetime | None = None,
     ):
+        if start is not None and end is not None and end < start:
+            raise ValueError(f'end {end} is before start {start}')
+
         self._sim_clock = sim_clock
         self._event_stores = list(event_stores)
         self._event_processor: EventProcessor | None = None
+        self._start = start
+        self._end = end
 
         self._merger_queue = MbtePriorityQueue[datetime, EventStoreItem | ScheduledItem]()
         self._internal_scheduling_id: int = 1
@@ -198,7 +234,12 @@ class EventSequencer(EventScheduler):
         )
         return self._remove_scheduled_id(schedule_id)
 
-    def run(self):
+    def run(self, until: datetime | None = None):
+        '''
+        Processes events until the stores are exhausted, the window end is
+        reached or, when given, until the first event at or after until.
+        A later run() call resumes where the previous one stopped.
+        '''
         if self._event_processor is None:
             logger.warning(
                 'cannot run without event processor',
@@ -206,7 +247,7 @@ class EventSequencer(EventScheduler):
             )
             return
         # keep running event by event util it is done
-        while self.advance():
+        while self.advance(until):
             pass
         logger.debug(
             'finished event sequencer run',
@@ -215,6 +256,8 @@ class EventSequencer(EventScheduler):
 
     def _init_queue(self):
         for event_store in self._event_stores:
+            if self._start is not None:
+                event_store.seek(self._start)
             self._replenish_from_store(event_store)
             
     def _remove_scheduled_id(self, schedule_id: int) -> bool:
@@ -226,7 +269,7 @@ class EventSequencer(EventScheduler):
 
     def _replenish_from_store(self, event_store: EventStore) -> bool:
         head = event_store.peek()
-        if head is None:
+        if head is None or self._is_past_end(head.timestamp):
             return False
         
         # put the next one from the event store into the merge queue
@@ -241,21 +284,26 @@ class EventSequencer(EventScheduler):
         self._internal_scheduling_id += 1
         return ret
 
-    def advance(self) -> bool:
+    def advance(self, until: datetime | None = None) -> bool:
         '''
         advance() does not necessarily process an event. If it encounters
         canceled scheduled event, it skips it in this iteration without 
         invoking event_processor
         
         :param self: Description
+        :param until: leave the next event in the queue if it is at or
+            after this timestamp
         :return: Description
         :rtype: bool
         '''
         assert self._event_processor is not None
 
-        head = self._merger_queue.pop()
-        if head is None:
+        head = self._merger_queue.peek()
+        if head is None or self._is_past_end(head[0]):
+            return False
+        if until is not None and head[0] >= until:
             return False
+        self._merger_queue.pop()
         
         timestamp, _, item = head
         if isinstance(item, ScheduledItem):
@@ -277,6 +325,9 @@ class EventSequencer(EventScheduler):
             self._replenish_from_store(item.event_store)
             return True
 
+    def _is_past_end(self, timestamp: datetime) -> bool:
+        return self._end is not None and timestamp >= self._end
+
     def _advance_clock(self, timestamp: datetime) -> None:
         # advance time if it sees a newer timestamp
         if self._sim_clock.now() < timestamp:
@@ -0,0 +1,320 @@
+'''
+Concrete EventStore implementations backed by in-memory arrays and files
+'''
+from bisect import bisect_left
+import copy
+from datetime import datetime
+import hashlib
+import json
+from typing import Callable, BinaryIO
+import logging
+import os
+import tempfile
+
+from anvil.event_processing import EventStore
+from anvil.events import Event
+from anvil.fingerprint import digest
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_STRIDE = 64
+
+
+class SparseTimestampIndex(object):
+    '''
+    A sparse index mapping every n-th event's timestamp to its position in
+    the underlying storage (a list index, a byte offset, ...).
+
+    Events must be sorted by timestamp. A lookup is a binary search over the
+    indexed timestamps, after which the caller scans at most one stride of
+    events to land on the exact one.
+    '''
+    def __init__(self):
+        self._timestamps: list[datetime] = []
+        self._positions: list[int] = []
+
+    def add(self, timestamp: datetime, position: int):
+        if self._timestamps and timestamp < self._timestamps[-1]:
+            raise ValueError(
+                f'index timestamps must be sorted, got {timestamp} '
+                f'after {self._timestamps[-1]}'
+            )
+        self._timestamps.append(timestamp)
+        self._positions.append(position)
+
+    def lower_bound(self, timestamp: datetime) -> int:
+        '''
+        Returns the position of the last indexed event strictly before the
+        given timestamp, or the first indexed position when there is none.
+        Scanning forward from there reaches the first event at or after the
+        timestamp.
+        '''
+        if not self._positions:
+            return 0
+        i = bisect_left(self._timestamps, timestamp)
+        return self._positions[max(i - 1, 0)]
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def entries(self) -> list[tuple[datetime, int]]:
+        return list(zip(self._timestamps, self._positions))
+
+
+class ArrayEventStore(EventStore):
+    '''
+    EventStore over an in-memory list of events sorted by timestamp.
+
+    view() gives another store over a [start, end) slice of the same events
+    with its own cursor. The events and the index are shared, not copied,
+    so many views of one loaded history are cheap.
+    '''
+    def __init__(
+            self,
+            name: str,
+            events: list[Event],
+            index_stride: int = DEFAULT_INDEX_STRIDE,
+    ):
+        self._name = name
+        self._events = list(events)
+        self._pos = 0
+        self._start_pos = 0
+        self._end_pos = len(self._events)
+        self._fingerprint: str | None = None
+
+        self._index = SparseTimestampIndex()
+        for i in range(0, len(self._events), index_stride):
+            self._index.add(self._events[i].timestamp, i)
+
+    def name(self) -> str:
+        return self._name
+
+    def peek(self) -> Event | None:
+        if self._pos >= self._end_pos:
+            return None
+        return self._events[self._pos]
+
+    def pop(self) -> Event | None:
+        item = self.peek()
+        if item is not None:
+            self._pos += 1
+        return item
+
+    def seek(self, timestamp: datetime) -> None:
+        # may move backward as well as forward, but stays within the view
+        self._pos = min(
+            max(self._find(timestamp), self._start_pos), self._end_pos
+        )
+
+    def view(
+            self,
+            start: datetime | None = None,
+            end: datetime | None = None,
+    ) -> 'ArrayEventStore':
+        '''
+        Returns a store over the events of this one within [start, end),
+        positioned at its first event.
+        '''
+        view = copy.copy(self)
+        if start is not None:
+            view._start_pos = max(self._find(start), self._start_pos)
+        if end is not None:
+            view._end_pos = min(self._find(end), self._end_pos)
+        view._end_pos = max(view._end_pos, view._start_pos)
+        view._pos = view._start_pos
+        view._fingerprint = None
+        return view
+
+    def fingerprint(self) -> str | None:
+        # events are frozen dataclasses, their repr covers every field
+        if self._fingerprint is None:
+            h = hashlib.sha256(self._name.encode())
+            for i in range(self._start_pos, self._end_pos):
+                h.update(repr(self._events[i]).encode())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def _find(self, timestamp: datetime) -> int:
+        '''
+        Position of the first event at or after timestamp
+        '''
+        pos = self._index.lower_bound(timestamp)
+        while pos < len(self._events) and self._events[pos].timestamp < timestamp:
+            pos += 1
+        return pos
+
+
+class FileEventStore(EventStore):
+    '''
+    EventStore over a line-oriented file with one event per line, sorted by
+    timestamp. Lines are turned into events by the given decode function.
+
+    The sparse index of byte offsets is built by one pass over the file,
+    decoding only every index_stride-th line, and saved in a sidecar file
+    next to the data (path + INDEX_SUFFIX). Later stores over the same file,
+    in this process or any worker, load the sidecar instead of scanning, so
+    a windowed run only decodes its window. The sidecar is rebuilt when the
+    file, the stride or the decoder changes, the decoder being identified by
+    its code and bound arguments (see anvil.fingerprint). A decoder that
+    cannot be identified that way, e.g. a callable object, gets an index in
+    memory only. An index can also be passed in directly, e.g. one from
+    build_index() with persist_index=False.
+
+    The store holds the file open until close(), or use it as a context
+    manager.
+    '''
+    INDEX_SUFFIX = '.idx'
+
+    def __init__(
+            self,
+            name: str,
+            path: str,
+            decode: Callable[[str], Event],
+            index: SparseTimestampIndex | None = None,
+            index_stride: int = DEFAULT_INDEX_STRIDE,
+            persist_index: bool = True,
+    ):
+        self._name = name
+        self._path = path
+        self._decode = decode
+        self._index = index
+        self._index_stride = index_stride
+        self._persist_index = persist_index
+        self._fingerprint: tuple[tuple[int, int], str] | None = None
+
+        self._file: BinaryIO = open(path, 'rb')
+        self._head: Event | None = None
+        self._read_head()
+
+    @staticmethod
+    def build_index(
+            path: str,
+            decode: Callable[[str], Event],
+            index_stride: int = DEFAULT_INDEX_STRIDE,
+    ) -> SparseTimestampIndex:
+        index = SparseTimestampIndex()
+        with open(path, 'rb') as f:
+            count = 0
+            offset = f.tell()
+            for line in iter(f.readline, b''):
+                if line.strip():
+                    if count % index_stride == 0:
+                        index.add(decode(line.decode()).timestamp, offset)
+                    count += 1
+                offset = f.tell()
+        logger.debug(
+            'built sparse timestamp index',
+            extra={'path': path, 'entries': len(index)},
+        )
+        return index
+
+    @classmethod
+    def load_index(
+            cls,
+            path: str,
+            decode: Callable[[str], Event],
+            index_stride: int = DEFAULT_INDEX_STRIDE,
+    ) -> SparseTimestampIndex:
+        '''
+        Loads the sidecar index of the file, building and saving it first
+        when it is missing or stale
+        '''
+        decoder = digest(decode)
+        if decoder is None:
+            logger.warning(
+                'decoder cannot be fingerprinted, not saving sidecar index',
+                extra={'path': path},
+            )
+            return cls.build_index(path, decode, index_stride)
+
+        stat = os.stat(path)
+        header = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'decoder': decoder,
+            'stride': index_stride,
+        }
+        sidecar = path + cls.INDEX_SUFFIX
+        try:
+            with open(sidecar) as f:
+                if json.loads(f.readline()) == header:
+                    index = SparseTimestampIndex()
+                    for line in f:
+                        timestamp, offset = line.rstrip('\n').rsplit(',', 1)
+                        index.add(datetime.fromisoformat(timestamp), int(offset))
+                    return index
+        except (OSError, ValueError):
+            pass
+
+        index = cls.build_index(path, decode, index_stride)
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp'
+            )
+        except OSError:
+            logger.warning('cannot save sidecar index', extra={'path': sidecar})
+            return index
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(json.dumps(header) + '\n')
+                for timestamp, offset in index.entries():
+                    f.write(f'{timestamp.isoformat()},{offset}\n')
+            # atomic, concurrent workers never read a partial index
+            os.replace(tmp_path, sidecar)
+        except OSError:
+            logger.warning('cannot save sidecar index', extra={'path': sidecar})
+            os.unlink(tmp_path)
+        return index
+
+    def __enter__(self) -> 'FileEventStore':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def name(self) -> str:
+        return self._name
+
+    def peek(self) -> Event | None:
+        return self._head
+
+    def pop(self) -> Event | None:
+        item = self._head
+        if item is not None:
+            self._read_head()
+        return item
+
+    def seek(self, timestamp: datetime) -> None:
+        if self._index is None:
+            build = self.load_index if self._persist_index else self.build_index
+            self._index = build(self._path, self._decode, self._index_stride)
+        self._file.seek(self._index.lower_bound(timestamp))
+        self._read_head()
+        while self._head is not None and self._head.timestamp < timestamp:
+            self._read_head()
+
+    def fingerprint(self) -> str | None:
+        # the events depend on the decoder as much as on the file
+        decoder = digest(self._decode)
+        if decoder is None:
+            return None
+        # hashing the content is expensive, only redo it if the file changed
+        stat = os.stat(self._path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        if self._fingerprint is None or self._fingerprint[0] != version:
+            h = hashlib.sha256(self._name.encode())
+            with open(self._path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    h.update(chunk)
+            self._fingerprint = (version, h.hexdigest())
+        return digest(self._fingerprint[1], decoder)
+
+    def close(self):
+        self._file.close()
+
+    def _read_head(self):
+        for line in iter(self._file.readline, b''):
+            if line.strip():
+                self._head = self._decode(line.decode())
+                return
+        self._head = None
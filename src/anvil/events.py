@@ -60,4 +60,13 @@ class InternalSchedulingEvent(Event):
     '''
     This is used as an internal scheduling event base class
     '''
-    pass
\ No newline at end of file
+    pass
+
+###################### Results #######################
+
+@dataclass(frozen=True)
+class EquityEvent(Event):
+    '''
+    A point on the equity curve of one symbol, recorded by the portfolio
+    '''
+    equity: float
@@ -0,0 +1,148 @@
+'''
+Stable digests of values and code, used to key data derived from them.
+
+A digest only depends on content, never on object identity or addresses,
+so it is the same across processes and sessions. Functions are identified
+by their loaded bytecode and constants, plus the defaults, closure and
+partial arguments they were bound with, so editing a function or binding
+it differently changes its digest. Classes are identified by name and by
+the functions and attributes defined along their MRO. All of this is read
+from the objects in memory, not from source files, so a module edited on
+disk but not reloaded keeps the digest of the code that actually runs.
+Globals a function refers to are only identified by name. numpy arrays are identified by dtype, shape and raw
+data, never by their repr, which elides large arrays.
+
+Values that cannot be described this way make digest() return None, the
+caller must then treat the input as unidentifiable rather than guess.
+'''
+from datetime import date, datetime, time, timedelta
+import dataclasses
+import functools
+import hashlib
+import types
+from typing import Any
+
+import numpy as np
+
+_SCALARS = (bool, int, float, complex, str, datetime, date, time, timedelta)
+
+# class attributes that describe the class rather than its behaviour, or
+# that the interpreter, abc and dataclasses add on their own
+_CLASS_METADATA = frozenset([
+    '__annotations__', '__dataclass_fields__', '__dataclass_params__',
+    '__dict__', '__doc__', '__module__', '__orig_bases__', '__parameters__',
+    '__qualname__', '__weakref__', '_abc_impl',
+])
+
+# implemented in C, there is no code to read, they are identified by name
+_NATIVE = (
+    types.BuiltinFunctionType, types.ClassMethodDescriptorType,
+    types.GetSetDescriptorType, types.MemberDescriptorType,
+    types.MethodDescriptorType, types.MethodWrapperType,
+    types.WrapperDescriptorType,
+)
+
+
+def digest(*values: Any) -> str | None:
+    h = hashlib.sha256()
+    active: set[int] = set()
+    for value in values:
+        if not _update(h, value, active):
+            return None
+    return h.hexdigest()
+
+
+def _update(h: Any, value: Any, active: set[int]) -> bool:
+    h.update(f'<{type(value).__module__}.{type(value).__qualname__}>'.encode())
+    if value is None or isinstance(value, _SCALARS):
+        h.update(repr(value).encode())
+        return True
+    if isinstance(value, (bytes, bytearray)):
+        h.update(len(value).to_bytes(8, 'little'))
+        h.update(value)
+        return True
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return False
+        h.update(f'{value.dtype.str}{value.shape}'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+        return True
+    if isinstance(value, np.generic):
+        return _update(h, value.item(), active)
+    if isinstance(value, (set, frozenset)):
+        # unordered, combine the digests of the items in sorted order
+        items = [digest(v) for v in value]
+        if None in items:
+            return False
+        h.update(''.join(sorted(items)).encode())  # type: ignore[arg-type]
+        return True
+    if isinstance(value, dict):
+        items = [(digest(k), digest(v)) for k, v in value.items()]
+        if any(k is None or v is None for k, v in items):
+            return False
+        h.update(repr(sorted(items)).encode())
+        return True
+
+    # containers and code may refer back to themselves, e.g. a recursive
+    # closure, a back-reference stands in for the repeated part
+    if id(value) in active:
+        h.update(b'<cycle>')
+        return True
+    active.add(id(value))
+    try:
+        return all(_update(h, v, active) for v in _parts(value))
+    except _Unsupported:
+        return False
+    finally:
+        active.discard(id(value))
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def _parts(value: Any) -> list[Any]:
+    '''
+    The values that identify a composite value
+    '''
+    if isinstance(value, (tuple, list)):
+        return [len(value), *value]
+    if isinstance(value, _NATIVE):
+        return [value.__qualname__]
+    if isinstance(value, type):
+        if value.__module__ == 'builtins':
+            return [value.__qualname__]
+        return [
+            (c.__module__, c.__qualname__, _class_members(c))
+            for c in value.__mro__
+            if c.__module__ != 'builtins'
+        ]
+    if dataclasses.is_dataclass(value):
+        return [type(value)] + [
+            (f.name, getattr(value, f.name)) for f in dataclasses.fields(value)
+        ]
+    if isinstance(value, types.CodeType):
+        return [value.co_code, value.co_names, value.co_consts]
+    if isinstance(value, types.FunctionType):
+        try:
+            closure = [c.cell_contents for c in value.__closure__ or ()]
+        except ValueError:
+            # an unbound cell, the function cannot run yet
+            raise _Unsupported()
+        return [value.__code__, value.__defaults__, value.__kwdefaults__, closure]
+    if isinstance(value, (staticmethod, classmethod)):
+        return [value.__func__]
+    if isinstance(value, property):
+        return [value.fget, value.fset, value.fdel]
+    if isinstance(value, types.MethodType):
+        return [value.__func__, value.__self__]
+    if isinstance(value, functools.partial):
+        return [value.func, value.args, value.keywords]
+    raise _Unsupported()
+
+
+def _class_members(cls: type) -> list[tuple[str, Any]]:
+    return sorted(
+        (name, value) for name, value in vars(cls).items()
+        if name not in _CLASS_METADATA
+    )
@@ -0,0 +1,191 @@
+'''
+Symbol-partitioned backtest runs.
+
+When a strategy has no cross-symbol interaction, each symbol can be replayed
+on its own. The universe is split into shards, and every shard runs its own
+EventSequencer, SimulationClock and processor in a worker process. The
+events recorded by the shards (fills, equity points, ...) are then merged
+into one global result in a canonical order. Within a symbol, events keep
+the order in which they were recorded, so the merge of a partitioned run is
+identical to the merge of a single-process run over the same universe.
+'''
+from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable
+import logging
+import os
+
+from anvil.clock import SimulationClock
+from anvil.event_processing import (
+    EventProcessor,
+    EventScheduler,
+    EventSequencer,
+    EventStore,
+)
+from anvil.events import EquityEvent, Event
+
+logger = logging.getLogger(__name__)
+
+
+class ShardProcessor(EventProcessor):
+    '''
+    EventProcessor of one shard that records its results as events
+    '''
+    @abstractmethod
+    def records(self) -> list[Event]:
+        '''
+        Recorded events, in the order they were produced
+        '''
+        pass
+
+
+# loads the event stores of the given symbols, called in the worker so the
+# data never has to be shipped between processes
+StoreFactory = Callable[[list[str]], list[EventStore]]
+ShardProcessorFactory = Callable[[SimulationClock, EventScheduler], ShardProcessor]
+
+
+@dataclass(frozen=True)
+class PartitionedResult:
+    symbols: list[str]
+    records: list[Event]
+
+    def by_symbol(self, symbol: str) -> list[Event]:
+        return [r for r in self.records if r.symbol == symbol]
+
+    def equity_curve(self) -> list[tuple[datetime, float]]:
+        '''
+        Total equity over time, summing the latest EquityEvent of each
+        symbol at every timestamp where any of them changes
+        '''
+        latest: dict[str, float] = {}
+        total = 0.0
+        curve: list[tuple[datetime, float]] = []
+        for r in self.records:
+            if not isinstance(r, EquityEvent):
+                continue
+            total += r.equity - latest.get(r.symbol, 0.0)
+            latest[r.symbol] = r.equity
+            if curve and curve[-1][0] == r.timestamp:
+                curve[-1] = (r.timestamp, total)
+            else:
+                curve.append((r.timestamp, total))
+        return curve
+
+
+def shard_symbols(symbols: list[str], n_shards: int) -> list[list[str]]:
+    '''
+    Deals the sorted symbols round-robin into at most n_shards shards
+    '''
+    ordered = sorted(set(symbols))
+    n_shards = max(1, min(n_shards, len(ordered)))
+    return [ordered[i::n_shards] for i in range(n_shards)]
+
+
+def merge_records(symbols: list[str], shard_records: list[list[Event]]) -> list[Event]:
+    '''
+    Merges recorded events by timestamp, then by symbol, keeping the order
+    each symbol recorded them in
+    '''
+    rank = {s: i for i, s in enumerate(sorted(set(symbols)))}
+    per_symbol: dict[str, list[Event]] = {s: [] for s in rank}
+    for records in shard_records:
+        for r in records:
+            if r.symbol not in per_symbol:
+                raise ValueError(f'recorded event for unknown symbol {r.symbol}')
+            per_symbol[r.symbol].append(r)
+
+    # stable sort, ties within a symbol keep their recorded order
+    merged = [r for s in per_symbol for r in per_symbol[s]]
+    merged.sort(key=lambda r: (r.timestamp, rank[r.symbol]))
+    return merged
+
+
+@dataclass(frozen=True)
+class _ShardTask:
+    symbols: list[str]
+    store_factory: StoreFactory
+    processor_factory: ShardProcessorFactory
+    init_time: datetime
+    start: datetime | None
+    end: datetime | None
+
+
+def _run_shard(task: _ShardTask) -> list[Event]:
+    sim_clock = SimulationClock(task.init_time)
+    sequencer = EventSequencer(
+        sim_clock=sim_clock,
+        event_stores=task.store_factory(task.symbols),
+        start=task.start,
+        end=task.end,
+    )
+    processor = task.processor_factory(sim_clock, sequencer)
+    sequencer.set_processor(processor)
+    sequencer.run()
+
+    records = processor.records()
+    shard = set(task.symbols)
+    for r in records:
+        if r.symbol not in shard:
+            raise ValueError(
+                f'shard of {task.symbols} recorded event for {r.symbol}, '
+                'the strategy is not symbol independent'
+            )
+    logger.debug(
+        'finished shard',
+        extra={'symbols': task.symbols, 'records': len(records)},
+    )
+    return records
+
+
+class PartitionedRunner(object):
+    '''
+    Runs a symbol independent strategy with the universe sharded across
+    worker processes. max_workers of None uses all cores and 1 or less runs
+    a single shard in-process. The factories must be picklable.
+    '''
+    def __init__(
+            self,
+            symbols: list[str],
+            store_factory: StoreFactory,
+            processor_factory: ShardProcessorFactory,
+            init_time: datetime,
+            start: datetime | None = None,
+            end: datetime | None = None,
+            max_workers: int | None = None,
+    ):
+        self._symbols = sorted(set(symbols))
+        self._store_factory = store_factory
+        self._processor_factory = processor_factory
+        self._init_time = init_time
+        self._start = start
+        self._end = end
+        self._max_workers = max_workers
+
+    def run(self) -> PartitionedResult:
+        if self._max_workers is not None and self._max_workers <= 1:
+            shard_records = [_run_shard(self._task(self._symbols))]
+        else:
+            n_shards = self._max_workers or os.cpu_count() or 1
+            tasks = [
+                self._task(s) for s in shard_symbols(self._symbols, n_shards)
+            ]
+            with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+                shard_records = list(pool.map(_run_shard, tasks))
+
+        return PartitionedResult(
+            symbols=self._symbols,
+            records=merge_records(self._symbols, shard_records),
+        )
+
+    def _task(self, symbols: list[str]) -> _ShardTask:
+        return _ShardTask(
+            symbols=symbols,
+            store_factory=self._store_factory,
+            processor_factory=self._processor_factory,
+            init_time=self._init_time,
+            start=self._start,
+            end=self._end,
+        )
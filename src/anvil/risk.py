@@ -0,0 +1,245 @@
+'''
+Incremental portfolio risk for position sizing during the simulation.
+
+RiskEngine keeps the dollar exposure of every symbol, an exponentially
+weighted covariance of close-to-close returns, and the products needed to
+answer risk queries without recomputing them:
+
+    - close events are buffered and applied once per timestamp, when the
+      first close of a later timestamp arrives or on flush(). That is the
+      only O(n^2) step, a vectorized covariance and C @ x update. Closes
+      arriving after a flush() at the same timestamp amend its update
+      instead of adding another one.
+    - a fill changes one exposure, so it updates C @ x in O(n) and the
+      portfolio variance, gross and net exposure in O(1).
+    - queries are O(1), or O(n) when they return a vector.
+
+Returns are simple returns between consecutive timestamps. A symbol
+without a close at a timestamp has a zero return for it. Volatilities are
+per timestamp and in dollars, not annualized.
+'''
+from datetime import datetime
+import logging
+import math
+
+import numpy as np
+
+from anvil.events import FillEvent, MarketCloseEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DECAY = 0.94
+
+
+class RiskEngine(object):
+    def __init__(
+            self,
+            decay: float = DEFAULT_DECAY,
+            symbols: list[str] | None = None,
+    ):
+        if not 0.0 < decay < 1.0:
+            raise ValueError(f'decay must be in (0, 1), got {decay}')
+        self._decay = decay
+
+        self._index: dict[str, int] = {}
+        capacity = max(len(symbols or []), 16)
+        self._qty = np.zeros(capacity)
+        self._price = np.zeros(capacity)  # mark, the close or a first fill
+        self._close = np.zeros(capacity)  # last applied close, for returns
+        self._exposure = np.zeros(capacity)
+        self._cov = np.zeros((capacity, capacity))
+        self._cov_exposure = np.zeros(capacity)  # C @ x
+
+        self._gross = 0.0
+        self._net = 0.0
+        self._variance = 0.0
+
+        self._pending: dict[int, float] = {}
+        self._pending_time: datetime | None = None
+        self._updates = 0
+
+        # the last applied timestamp, the close before it of every symbol
+        # that closed at it and the returns it added to the covariance
+        self._applied_time: datetime | None = None
+        self._applied_base: dict[int, float] = {}
+        self._applied_returns = np.zeros(0)
+
+        for s in symbols or []:
+            self._get_index(s)
+
+    ######################## Updates ########################
+
+    def on_close(self, event: MarketCloseEvent) -> None:
+        if self._pending_time is not None and event.timestamp > self._pending_time:
+            self.flush()
+        self._pending_time = event.timestamp
+        self._pending[self._get_index(event.symbol)] = event.price
+
+    def on_fill(self, fill: FillEvent) -> None:
+        i = self._get_index(fill.symbol)
+        if self._price[i] == 0.0:
+            self._price[i] = fill.last_price
+        self._qty[i] += fill.last_qty
+
+        # exposure is marked at the last close, like the rest of the book,
+        # or at the fill price until the first close is applied. The fill
+        # price never enters returns.
+        d = fill.last_qty * self._price[i]
+        x = self._exposure[i]
+        self._gross += abs(x + d) - abs(x)
+        self._net += d
+        self._variance += 2.0 * d * self._cov_exposure[i] + d * d * self._cov[i, i]
+        self._cov_exposure += self._cov[:, i] * d
+        self._exposure[i] = x + d
+
+    def flush(self) -> None:
+        '''
+        Applies the buffered closes of the current timestamp. When the
+        timestamp was already flushed, its update is redone with all of its
+        closes, so a flush in the middle of a timestamp takes no extra
+        decay step and keeps the cross terms between closes on either side
+        of it.
+        '''
+        if not self._pending:
+            return
+        n = len(self._index)
+        amend = self._pending_time == self._applied_time
+        if not amend:
+            self._applied_time = self._pending_time
+            self._applied_base = {}
+            self._applied_returns = np.zeros(0)
+        for i in self._pending:
+            # a symbol closing twice keeps the close before the timestamp
+            self._applied_base.setdefault(i, float(self._close[i]))
+
+        count = len(self._pending)
+        idx = np.fromiter(self._pending.keys(), dtype=np.intp, count=count)
+        new_price = np.fromiter(self._pending.values(), dtype=float, count=count)
+        old_close = np.fromiter(
+            (self._applied_base[i] for i in self._pending), dtype=float, count=count
+        )
+        self._pending.clear()
+
+        previous = np.zeros(n)
+        previous[:len(self._applied_returns)] = self._applied_returns
+        returns = previous.copy()
+        seen = old_close > 0.0
+        returns[idx[seen]] = new_price[seen] / old_close[seen] - 1.0
+
+        cov = self._cov[:n, :n]
+        if amend:
+            # replace the returns of the timestamp, the decay is already in
+            cov += (1.0 - self._decay) * (
+                np.outer(returns, returns) - np.outer(previous, previous)
+            )
+        else:
+            cov *= self._decay
+            cov += (1.0 - self._decay) * np.outer(returns, returns)
+            self._updates += 1
+        self._applied_returns = returns
+
+        self._close[idx] = new_price
+        self._price[idx] = new_price
+        self._recompute(n)
+
+    def _recompute(self, n: int) -> None:
+        x = self._qty[:n] * self._price[:n]
+        self._exposure[:n] = x
+        self._gross = float(np.abs(x).sum())
+        self._net = float(x.sum())
+        self._cov_exposure[:n] = self._cov[:n, :n] @ x
+        self._variance = float(x @ self._cov_exposure[:n])
+
+    def _get_index(self, symbol: str) -> int:
+        i = self._index.get(symbol)
+        if i is not None:
+            return i
+        i = len(self._index)
+        if i == len(self._qty):
+            self._grow(2 * i)
+        self._index[symbol] = i
+        return i
+
+    def _grow(self, capacity: int) -> None:
+        n = len(self._qty)
+        for name in ['_qty', '_price', '_close', '_exposure', '_cov_exposure']:
+            grown = np.zeros(capacity)
+            grown[:n] = getattr(self, name)
+            setattr(self, name, grown)
+        cov = np.zeros((capacity, capacity))
+        cov[:n, :n] = self._cov
+        self._cov = cov
+        logger.debug('grew risk engine', extra={'capacity': capacity})
+
+    ######################## Queries ########################
+
+    def symbols(self) -> list[str]:
+        return list(self._index)
+
+    def update_count(self) -> int:
+        '''
+        Number of timestamps applied to the covariance so far
+        '''
+        return self._updates
+
+    def position(self, symbol: str) -> float:
+        i = self._index.get(symbol)
+        return 0.0 if i is None else float(self._qty[i])
+
+    def exposure(self, symbol: str) -> float:
+        i = self._index.get(symbol)
+        return 0.0 if i is None else float(self._exposure[i])
+
+    def gross_exposure(self) -> float:
+        return self._gross
+
+    def net_exposure(self) -> float:
+        return self._net
+
+    def weight(self, symbol: str) -> float:
+        '''
+        Exposure of the symbol as a fraction of gross exposure
+        '''
+        if self._gross == 0.0:
+            return 0.0
+        return self.exposure(symbol) / self._gross
+
+    def weights(self) -> dict[str, float]:
+        n = len(self._index)
+        if self._gross == 0.0:
+            return dict.fromkeys(self._index, 0.0)
+        w = self._exposure[:n] / self._gross
+        return dict(zip(self._index, w.tolist()))
+
+    def covariance(self, a: str, b: str) -> float:
+        i, j = self._index.get(a), self._index.get(b)
+        if i is None or j is None:
+            return 0.0
+        return float(self._cov[i, j])
+
+    def volatility(self, symbol: str) -> float:
+        '''
+        Return volatility of the symbol per timestamp
+        '''
+        return math.sqrt(max(self.covariance(symbol, symbol), 0.0))
+
+    def portfolio_variance(self) -> float:
+        return max(self._variance, 0.0)
+
+    def portfolio_volatility(self) -> float:
+        '''
+        Dollar volatility of the portfolio per timestamp
+        '''
+        return math.sqrt(self.portfolio_variance())
+
+    def variance_after(self, symbol: str, qty_delta: float) -> float:
+        '''
+        Portfolio variance if the position in symbol changed by qty_delta,
+        for sizing an order before sending it
+        '''
+        i = self._index.get(symbol)
+        if i is None:
+            return self.portfolio_variance()
+        d = qty_delta * self._price[i]
+        variance = self._variance + 2.0 * d * self._cov_exposure[i] + d * d * self._cov[i, i]
+        return max(float(variance), 0.0)
@@ -0,0 +1,220 @@
+'''
+Time-sliced parallel backtests.
+
+A long backtest is split into consecutive chunks of time that run in
+parallel processes. Every chunk but the first starts a warm-up period
+early, so its strategy state has converged by the time the chunk proper
+begins. Records produced during the warm-up are dropped and the equity of
+each chunk is offset so the chunks stitch into one continuous curve.
+
+Stitching is only sound if the warm-up really reproduces the state a
+serial run would have at the chunk boundary. The processor reports its
+state at the boundary from both sides, the end of the previous chunk and
+the end of the warm-up, and every boundary where the two differ is
+flagged as not converged.
+'''
+from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Any, Callable
+import logging
+import operator
+
+from anvil.clock import SimulationClock
+from anvil.event_processing import EventScheduler, EventSequencer, EventStore
+from anvil.events import EquityEvent, Event
+from anvil.partitioned import PartitionedResult, ShardProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkProcessor(ShardProcessor):
+    '''
+    ShardProcessor that can also report its state, e.g. positions and
+    indicator values, to check convergence at chunk boundaries
+    '''
+    @abstractmethod
+    def state(self) -> Any:
+        pass
+
+
+# loads the event stores, called in the worker so the data never has to be
+# shipped between processes
+ChunkStoreFactory = Callable[[], list[EventStore]]
+ChunkProcessorFactory = Callable[[SimulationClock, EventScheduler], ChunkProcessor]
+
+
+@dataclass(frozen=True)
+class ChunkBoundary:
+    timestamp: datetime
+    converged: bool
+    previous_state: Any
+    state: Any
+
+
+@dataclass(frozen=True)
+class TimeSlicedResult(PartitionedResult):
+    boundaries: list[ChunkBoundary] = field(default_factory=list)
+
+    def converged(self) -> bool:
+        return all(b.converged for b in self.boundaries)
+
+
+def time_chunks(
+        start: datetime,
+        end: datetime,
+        n_chunks: int,
+) -> list[tuple[datetime, datetime]]:
+    '''
+    Splits [start, end) into n_chunks consecutive windows of equal length
+    '''
+    if n_chunks < 1:
+        raise ValueError(f'n_chunks must be positive, got {n_chunks}')
+    if end <= start:
+        raise ValueError(f'end {end} is not after start {start}')
+    step = (end - start) / n_chunks
+    bounds = [start + step * i for i in range(n_chunks)] + [end]
+    return list(zip(bounds, bounds[1:]))
+
+
+@dataclass(frozen=True)
+class _ChunkTask:
+    warmup_start: datetime
+    start: datetime
+    end: datetime
+    store_factory: ChunkStoreFactory
+    processor_factory: ChunkProcessorFactory
+
+
+@dataclass(frozen=True)
+class _ChunkOutput:
+    warmup_records: list[Event]
+    records: list[Event]
+    start_state: Any
+    end_state: Any
+
+
+def _run_chunk(task: _ChunkTask) -> _ChunkOutput:
+    sim_clock = SimulationClock(task.warmup_start)
+    sequencer = EventSequencer(
+        sim_clock=sim_clock,
+        event_stores=task.store_factory(),
+        start=task.warmup_start,
+        end=task.end,
+    )
+    processor = task.processor_factory(sim_clock, sequencer)
+    sequencer.set_processor(processor)
+
+    sequencer.run(until=task.start)
+    start_state = processor.state()
+    n_warmup = len(processor.records())
+    sequencer.run()
+
+    records = processor.records()
+    logger.debug(
+        'finished chunk',
+        extra={'start': task.start, 'end': task.end, 'records': len(records)},
+    )
+    return _ChunkOutput(
+        warmup_records=records[:n_warmup],
+        records=records[n_warmup:],
+        start_state=start_state,
+        end_state=processor.state(),
+    )
+
+
+def _last_equity(records: list[Event]) -> dict[str, float]:
+    return {r.symbol: r.equity for r in records if isinstance(r, EquityEvent)}
+
+
+def _stitch(outputs: list[_ChunkOutput]) -> list[Event]:
+    '''
+    Concatenates the records of consecutive chunks. The equity of each
+    symbol in a chunk is shifted by the difference between its equity at
+    the end of the previous chunks and at the end of the chunk's warm-up.
+    '''
+    stitched: list[Event] = []
+    equity: dict[str, float] = {}
+    for output in outputs:
+        warmup_equity = _last_equity(output.warmup_records)
+        offsets = {
+            s: equity.get(s, 0.0) - warmup_equity.get(s, 0.0)
+            for s in set(equity) | set(warmup_equity)
+        }
+        for r in output.records:
+            if isinstance(r, EquityEvent):
+                r = replace(r, equity=r.equity + offsets.get(r.symbol, 0.0))
+                equity[r.symbol] = r.equity
+            stitched.append(r)
+    return stitched
+
+
+class TimeSlicedRunner(object):
+    '''
+    Runs [start, end) as n_chunks chunks across worker processes, each
+    chunk after the first warming up from warmup before its start. The
+    first chunk starts at start exactly, like a serial run would.
+
+    max_workers of None uses all cores and 1 or less runs the chunks
+    in-process. state_equal compares boundary states, override it to allow
+    for floating point noise. The factories must be picklable.
+    '''
+    def __init__(
+            self,
+            store_factory: ChunkStoreFactory,
+            processor_factory: ChunkProcessorFactory,
+            start: datetime,
+            end: datetime,
+            n_chunks: int,
+            warmup: timedelta,
+            state_equal: Callable[[Any, Any], bool] = operator.eq,
+            max_workers: int | None = None,
+    ):
+        if warmup < timedelta(0):
+            raise ValueError(f'warmup must not be negative, got {warmup}')
+        self._store_factory = store_factory
+        self._processor_factory = processor_factory
+        self._chunks = time_chunks(start, end, n_chunks)
+        self._warmup = warmup
+        self._state_equal = state_equal
+        self._max_workers = max_workers
+
+    def run(self) -> TimeSlicedResult:
+        tasks = [
+            _ChunkTask(
+                warmup_start=chunk_start - self._warmup if i > 0 else chunk_start,
+                start=chunk_start,
+                end=chunk_end,
+                store_factory=self._store_factory,
+                processor_factory=self._processor_factory,
+            )
+            for i, (chunk_start, chunk_end) in enumerate(self._chunks)
+        ]
+        if self._max_workers is not None and self._max_workers <= 1:
+            outputs = [_run_chunk(t) for t in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=self._max_workers) as pool:
+                outputs = list(pool.map(_run_chunk, tasks))
+
+        boundaries: list[ChunkBoundary] = []
+        for task, prev, output in zip(tasks[1:], outputs, outputs[1:]):
+            boundary = ChunkBoundary(
+                timestamp=task.start,
+                converged=self._state_equal(prev.end_state, output.start_state),
+                previous_state=prev.end_state,
+                state=output.start_state,
+            )
+            if not boundary.converged:
+                logger.warning(
+                    'strategy state did not converge within warm-up',
+                    extra={'boundary': task.start, 'warmup': self._warmup},
+                )
+            boundaries.append(boundary)
+
+        records = _stitch(outputs)
+        return TimeSlicedResult(
+            symbols=sorted({r.symbol for r in records}),
+            records=records,
+            boundaries=boundaries,
+        )
@@ -0,0 +1,614 @@
+'''
+Monte Carlo validation of the must-have sanity checks in the README.
+
+Running thousands of random paths through an EventSequencer one event at a
+time is too slow, so the harness works on whole batches of paths at once.
+Random-walk prices are generated as a (paths, steps) array, each signal
+family turns a batch into a positions array of the same shape, and the
+execution model from the README (one-step lag, proportional costs) is
+applied with array operations. Batches are spread over a process pool.
+
+    - Zero-signal: signal 0 gives exactly zero P&L, costs and Sharpe.
+    - Random-signal: random +/-1 signals lose money after costs and their
+      Sharpe is around or below 0.
+    - Known-failure: moving average crossover on a random walk has no
+      persistent alpha.
+    - Engine-agreement: a sample of paths replayed through EventSequencer
+      and MbteProcessor gives the same P&L, costs and Sharpe as the
+      vectorized model, so the checks above hold for the engine too.
+
+A Strategy can be put through the same checks with StrategySignal, which
+runs it over every path, e.g. `python -m anvil.validation
+mypackage.strategies:build` with a function returning a new Strategy.
+
+Run it with `python -m anvil.validation`.
+'''
+from abc import ABC, abstractmethod
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import importlib
+import logging
+import math
+from typing import Callable
+
+import numpy as np
+
+from anvil.clock import SimulationClock
+from anvil.core import Execution, MbteProcessor, Portfolio, Strategy
+from anvil.event_processing import EventSequencer
+from anvil.event_stores import ArrayEventStore
+from anvil.events import Event, FillEvent, MarketCloseEvent, OrderEvent, SignalEvent
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+
+# simulated paths are fed to strategies as daily closes of one symbol
+PATH_SYMBOL = 'PATH'
+PATH_START = datetime(2000, 1, 3, 16, 0)
+
+DEFAULT_ENGINE_PATHS = 20
+
+# builds a new Strategy for every path, must be picklable to run in a
+# process pool, i.e. a module level function or class
+StrategyFactory = Callable[[], Strategy]
+
+
+@dataclass(frozen=True)
+class MonteCarloConfig:
+    n_paths: int = 4000
+    n_steps: int = TRADING_DAYS
+    start_price: float = 100.0
+    volatility: float = 0.01
+    cost_rate: float = 0.0005
+    batch_size: int = 500
+    seed: int = 0
+    # None uses all cores, 1 or less runs the batches in-process
+    max_workers: int | None = None
+
+
+def random_walk_paths(
+        rng: np.random.Generator,
+        n_paths: int,
+        n_steps: int,
+        start_price: float = 100.0,
+        volatility: float = 0.01,
+) -> np.ndarray:
+    '''
+    Generates a (n_paths, n_steps) array of driftless geometric random walk
+    prices, all starting at start_price.
+    '''
+    log_returns = rng.normal(0.0, volatility, size=(n_paths, n_steps - 1))
+    log_prices = np.concatenate(
+        [np.zeros((n_paths, 1)), np.cumsum(log_returns, axis=1)], axis=1
+    )
+    return start_price * np.exp(log_prices)
+
+
+######################### Signal Families ###########################
+
+class SignalFamily(ABC):
+    '''
+    A vectorized signal. positions() maps a (paths, steps) price array to
+    the desired position at each step, using prices up to that step only.
+    '''
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @abstractmethod
+    def positions(self, prices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        pass
+
+
+class ZeroSignal(SignalFamily):
+    def name(self) -> str:
+        return 'zero'
+
+    def positions(self, prices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return np.zeros_like(prices)
+
+
+class RandomSignal(SignalFamily):
+    def name(self) -> str:
+        return 'random'
+
+    def positions(self, prices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return rng.choice(np.array([-1.0, 1.0]), size=prices.shape)
+
+
+@dataclass(frozen=True)
+class MovingAverageCrossover(SignalFamily):
+    fast: int = 10
+    slow: int = 50
+
+    def name(self) -> str:
+        return f'ma-crossover-{self.fast}-{self.slow}'
+
+    def positions(self, prices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        fast = _trailing_mean(prices, self.fast)
+        slow = _trailing_mean(prices, self.slow)
+        # flat until the slow window has filled up
+        return np.nan_to_num(np.sign(fast - slow))
+
+
+@dataclass(frozen=True)
+class StrategySignal(SignalFamily):
+    '''
+    Runs a Strategy over each path, one MarketCloseEvent per step, and
+    takes the value of its signals as the position. Without a signal the
+    previous position is held.
+    '''
+    label: str
+    factory: StrategyFactory
+
+    def name(self) -> str:
+        return self.label
+
+    def positions(self, prices: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        out = np.zeros_like(prices)
+        for path, row in enumerate(prices):
+            strategy = self.factory()
+            value = 0.0
+            for step, event in enumerate(_path_events(row)):
+                signal = strategy.on_event(event)
+                if signal is not None:
+                    value = signal.value
+                out[path, step] = value
+        return out
+
+
+def _path_events(row: np.ndarray) -> list[Event]:
+    return [
+        MarketCloseEvent(PATH_START + timedelta(days=step), PATH_SYMBOL, float(price), 0.0)
+        for step, price in enumerate(row)
+    ]
+
+
+def _trailing_mean(prices: np.ndarray, window: int) -> np.ndarray:
+    cumsum = np.cumsum(prices, axis=1)
+    out = np.full_like(prices, np.nan)
+    out[:, window - 1] = cumsum[:, window - 1]
+    out[:, window:] = cumsum[:, window:] - cumsum[:, :-window]
+    return out / window
+
+
+######################### Simulation ###########################
+
+@dataclass(frozen=True)
+class PathMetrics:
+    '''
+    Per path metrics of one signal family, each an array of length n_paths
+    '''
+    pnl: np.ndarray
+    costs: np.ndarray
+    sharpe: np.ndarray
+
+    @staticmethod
+    def concatenate(parts: list['PathMetrics']) -> 'PathMetrics':
+        return PathMetrics(
+            pnl=np.concatenate([p.pnl for p in parts]),
+            costs=np.concatenate([p.costs for p in parts]),
+            sharpe=np.concatenate([p.sharpe for p in parts]),
+        )
+
+
+def simulate(
+        prices: np.ndarray,
+        signals: np.ndarray,
+        cost_rate: float,
+) -> PathMetrics:
+    '''
+    Applies the README execution model to a batch of paths. The signal at
+    step t executes at the price of step t+1 and is held until t+2. Each
+    trade pays cost_rate times its traded notional.
+    '''
+    positions = np.zeros_like(signals)
+    positions[:, 1:] = signals[:, :-1]
+
+    # step t earns the position held since t-1 and pays for the trade at t,
+    # nothing trades at step 0
+    gross = positions[:, :-1] * np.diff(prices, axis=1)
+    traded = np.abs(np.diff(positions, axis=1))
+    costs = traded * prices[:, 1:] * cost_rate
+    return _path_metrics(gross - costs, costs)
+
+
+def _path_metrics(daily: np.ndarray, costs: np.ndarray) -> PathMetrics:
+    '''
+    Metrics of (paths, steps) arrays of daily P&L after costs and costs
+    '''
+    mean = daily.mean(axis=1)
+    std = daily.std(axis=1)
+    sharpe = np.zeros_like(mean)
+    np.divide(mean, std, out=sharpe, where=std > 0)
+
+    return PathMetrics(
+        pnl=daily.sum(axis=1),
+        costs=costs.sum(axis=1),
+        sharpe=sharpe * math.sqrt(TRADING_DAYS),
+    )
+
+
+######################### Engine Replay ###########################
+
+class _ReplayStrategy(Strategy):
+    '''
+    Emits precomputed positions of one path, one per close
+    '''
+    def __init__(self, positions: np.ndarray):
+        self._positions = positions
+        self._step = 0
+
+    def on_event(self, event: Event) -> SignalEvent | None:
+        value = float(self._positions[self._step])
+        self._step += 1
+        return SignalEvent(event.timestamp, event.symbol, value)
+
+
+class _TargetPortfolio(Portfolio):
+    '''
+    Orders the difference between the signalled and the current position
+    '''
+    def __init__(self):
+        self._target = 0
+
+    def on_signal(self, signal: SignalEvent) -> OrderEvent | None:
+        target = int(signal.value)
+        qty, self._target = target - self._target, target
+        if qty == 0:
+            return None
+        return OrderEvent(signal.timestamp, signal.symbol, None, qty)
+
+    def on_fill(self, fill: FillEvent) -> OrderEvent | None:
+        return None
+
+
+class _LaggedExecution(Execution):
+    '''
+    The README execution model: an order fills at the next close and pays
+    cost_rate times its traded notional. Keeps the P&L and costs of every
+    step after the first.
+    '''
+    def __init__(self, cost_rate: float):
+        self._cost_rate = cost_rate
+        self._position = 0
+        self._pending = 0
+        self._last_price: float | None = None
+        self.daily: list[float] = []
+        self.costs: list[float] = []
+
+    def on_close(self, event: MarketCloseEvent) -> None:
+        if self._last_price is not None:
+            gross = self._position * (event.price - self._last_price)
+            cost = abs(self._pending) * event.price * self._cost_rate
+            self._position += self._pending
+            self.daily.append(gross - cost)
+            self.costs.append(cost)
+        self._pending = 0
+        self._last_price = event.price
+
+    def receive(self, order: OrderEvent) -> None:
+        self._pending += order.qty
+
+
+class _MarketFeed(Strategy):
+    '''
+    Passes every close to the execution before the strategy sees it, so
+    orders from the previous step fill ahead of the new signal
+    '''
+    def __init__(self, strategy: Strategy, execution: _LaggedExecution):
+        self._strategy = strategy
+        self._execution = execution
+
+    def on_event(self, event: Event) -> SignalEvent | None:
+        if isinstance(event, MarketCloseEvent):
+            self._execution.on_close(event)
+        return self._strategy.on_event(event)
+
+
+def replay_through_engine(
+        prices: np.ndarray,
+        strategies: list[Strategy],
+        cost_rate: float,
+) -> PathMetrics:
+    '''
+    Runs every path through its own EventSequencer and MbteProcessor with
+    the given strategy, one per path, and the README execution model.
+    Positions are whole units.
+    '''
+    daily: list[list[float]] = []
+    costs: list[list[float]] = []
+    for row, strategy in zip(prices, strategies):
+        execution = _LaggedExecution(cost_rate)
+        sequencer = EventSequencer(
+            sim_clock=SimulationClock(PATH_START),
+            event_stores=[ArrayEventStore(PATH_SYMBOL, _path_events(row))],
+        )
+        sequencer.set_processor(MbteProcessor(
+            _MarketFeed(strategy, execution), _TargetPortfolio(), execution
+        ))
+        sequencer.run()
+        daily.append(execution.daily)
+        costs.append(execution.costs)
+    return _path_metrics(np.array(daily), np.array(costs))
+
+
+def _run_batch(
+        seed: np.random.SeedSequence,
+        n_paths: int,
+        config: MonteCarloConfig,
+        signals: list[SignalFamily],
+) -> dict[str, PathMetrics]:
+    rng = np.random.default_rng(seed)
+    prices = random_walk_paths(
+        rng, n_paths, config.n_steps, config.start_price, config.volatility
+    )
+    # every family sees the same paths
+    return {
+        s.name(): simulate(prices, s.positions(prices, rng), config.cost_rate)
+        for s in signals
+    }
+
+
+def run_monte_carlo(
+        signals: list[SignalFamily],
+        config: MonteCarloConfig = MonteCarloConfig(),
+) -> dict[str, PathMetrics]:
+    '''
+    Simulates config.n_paths random walks in batches, across a process pool
+    unless config.max_workers is 1 or less. Results are reproducible for a
+    given seed and batch_size regardless of the number of workers.
+    '''
+    sizes = [
+        min(config.batch_size, config.n_paths - start)
+        for start in range(0, config.n_paths, config.batch_size)
+    ]
+    seeds = np.random.SeedSequence(config.seed).spawn(len(sizes))
+    args = [
+        (seed, size, config, signals) for seed, size in zip(seeds, sizes)
+    ]
+
+    if config.max_workers is not None and config.max_workers <= 1:
+        batches = [_run_batch(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=config.max_workers) as pool:
+            batches = list(pool.map(_run_batch, *zip(*args)))
+
+    logger.debug(
+        'finished monte carlo run',
+        extra={'n_paths': config.n_paths, 'batches': len(batches)},
+    )
+    return {
+        s.name(): PathMetrics.concatenate([b[s.name()] for b in batches])
+        for s in signals
+    }
+
+
+######################### Checks ###########################
+
+@dataclass(frozen=True)
+class CheckReport:
+    name: str
+    passed: bool
+    reason: str
+    metrics: PathMetrics = field(repr=False)
+
+    def summary(self) -> dict[str, float]:
+        pnl, sharpe = self.metrics.pnl, self.metrics.sharpe
+        return {
+            'pnl_mean': float(pnl.mean()),
+            'pnl_std': float(pnl.std()),
+            'pnl_p05': float(np.percentile(pnl, 5)),
+            'pnl_p95': float(np.percentile(pnl, 95)),
+            'sharpe_mean': float(sharpe.mean()),
+            'sharpe_p05': float(np.percentile(sharpe, 5)),
+            'sharpe_p95': float(np.percentile(sharpe, 95)),
+            'costs_mean': float(self.metrics.costs.mean()),
+        }
+
+
+class SanityCheck(ABC):
+    '''
+    A pass/fail bound on the distribution of results of one signal family
+    '''
+    def __init__(self, name: str, signal: SignalFamily):
+        self._name = name
+        self._signal = signal
+
+    def name(self) -> str:
+        return self._name
+
+    def signal(self) -> SignalFamily:
+        return self._signal
+
+    def report(self, metrics: PathMetrics) -> CheckReport:
+        passed, reason = self.evaluate(metrics)
+        return CheckReport(self._name, passed, reason, metrics)
+
+    @abstractmethod
+    def evaluate(self, metrics: PathMetrics) -> tuple[bool, str]:
+        pass
+
+
+class ZeroSignalCheck(SanityCheck):
+    def __init__(self):
+        super().__init__('zero-signal', ZeroSignal())
+
+    def evaluate(self, metrics: PathMetrics) -> tuple[bool, str]:
+        for label, values in [
+            ('pnl', metrics.pnl),
+            ('costs', metrics.costs),
+            ('sharpe', metrics.sharpe),
+        ]:
+            if np.any(values != 0):
+                return False, f'non-zero {label} on {np.count_nonzero(values)} paths'
+        return True, 'pnl, costs and sharpe are all zero'
+
+
+class RandomSignalCheck(SanityCheck):
+    def __init__(self, max_mean_sharpe: float = 0.0):
+        super().__init__('random-signal', RandomSignal())
+        self._max_mean_sharpe = max_mean_sharpe
+
+    def evaluate(self, metrics: PathMetrics) -> tuple[bool, str]:
+        mean_pnl = metrics.pnl.mean()
+        mean_sharpe = metrics.sharpe.mean()
+        if mean_pnl >= 0:
+            return False, f'mean pnl {mean_pnl:.4f} is not negative after costs'
+        if mean_sharpe > self._max_mean_sharpe:
+            return False, (
+                f'mean sharpe {mean_sharpe:.4f} above {self._max_mean_sharpe}'
+            )
+        return True, f'mean pnl {mean_pnl:.4f}, mean sharpe {mean_sharpe:.4f}'
+
+
+class KnownFailureCheck(SanityCheck):
+    '''
+    Fails when the mean P&L before costs is significantly positive, i.e.
+    its z-score across paths is above max_z. Alpha is judged gross, costs
+    would otherwise mask a leak.
+    '''
+    def __init__(
+            self,
+            fast: int = 10,
+            slow: int = 50,
+            max_z: float = 3.0,
+            signal: SignalFamily | None = None,
+    ):
+        # any other signal family, e.g. a StrategySignal, replaces the
+        # crossover
+        if signal is None:
+            super().__init__('known-failure', MovingAverageCrossover(fast, slow))
+        else:
+            super().__init__(f'known-failure-{signal.name()}', signal)
+        self._max_z = max_z
+
+    def evaluate(self, metrics: PathMetrics) -> tuple[bool, str]:
+        gross = metrics.pnl + metrics.costs
+        stderr = gross.std() / math.sqrt(len(gross))
+        z = gross.mean() / stderr if stderr > 0 else 0.0
+        if z > self._max_z:
+            return False, (
+                f'persistent alpha, gross pnl z-score {z:.2f} above {self._max_z}'
+            )
+        return True, f'gross pnl z-score {z:.2f}'
+
+
+class EngineAgreementCheck(object):
+    '''
+    Replays a sample of paths through the engine, see
+    replay_through_engine(), and fails when P&L, costs or Sharpe differ from
+    simulate() on the same positions. A StrategySignal runs its own Strategy
+    in the engine, other families replay their positions.
+    '''
+    def __init__(
+            self,
+            signal: SignalFamily,
+            n_paths: int = DEFAULT_ENGINE_PATHS,
+            tolerance: float = 1e-9,
+    ):
+        self._signal = signal
+        self._n_paths = n_paths
+        self._tolerance = tolerance
+
+    def name(self) -> str:
+        return f'engine-agreement-{self._signal.name()}'
+
+    def run(self, config: MonteCarloConfig = MonteCarloConfig()) -> CheckReport:
+        rng = np.random.default_rng(config.seed)
+        prices = random_walk_paths(
+            rng, self._n_paths, config.n_steps, config.start_price, config.volatility
+        )
+        positions = self._signal.positions(prices, rng)
+        expected = simulate(prices, positions, config.cost_rate)
+
+        strategies: list[Strategy]
+        if isinstance(self._signal, StrategySignal):
+            strategies = [self._signal.factory() for _ in range(self._n_paths)]
+        else:
+            strategies = [_ReplayStrategy(p) for p in positions]
+        actual = replay_through_engine(prices, strategies, config.cost_rate)
+
+        for label, a, e in [
+            ('pnl', actual.pnl, expected.pnl),
+            ('costs', actual.costs, expected.costs),
+            ('sharpe', actual.sharpe, expected.sharpe),
+        ]:
+            mismatch = ~np.isclose(a, e, rtol=self._tolerance, atol=self._tolerance)
+            if np.any(mismatch):
+                path = int(np.argmax(mismatch))
+                return CheckReport(self.name(), False, (
+                    f'{label} differs from the engine on {np.count_nonzero(mismatch)} '
+                    f'of {self._n_paths} paths, e.g. {e[path]:.6f} vs {a[path]:.6f}'
+                ), actual)
+        return CheckReport(
+            self.name(), True, f'engine matches on {self._n_paths} paths', actual
+        )
+
+
+def default_checks() -> list[SanityCheck]:
+    return [ZeroSignalCheck(), RandomSignalCheck(), KnownFailureCheck()]
+
+
+def strategy_checks(strategy: StrategySignal, max_z: float = 3.0) -> list[SanityCheck]:
+    '''
+    Checks for a strategy under release: like the crossover, it must not
+    find persistent alpha in a random walk
+    '''
+    return [KnownFailureCheck(max_z=max_z, signal=strategy)]
+
+
+def run_checks(
+        checks: list[SanityCheck] | None = None,
+        config: MonteCarloConfig = MonteCarloConfig(),
+        engine_paths: int = DEFAULT_ENGINE_PATHS,
+) -> list[CheckReport]:
+    '''
+    Runs the checks on config.n_paths paths, then replays engine_paths of
+    them through the engine for every signal family involved, none when 0
+    '''
+    if checks is None:
+        checks = default_checks()
+    results = run_monte_carlo([c.signal() for c in checks], config)
+    reports = [c.report(results[c.signal().name()]) for c in checks]
+
+    if engine_paths > 0:
+        families = {c.signal().name(): c.signal() for c in checks}
+        reports.extend(
+            EngineAgreementCheck(f, engine_paths).run(config) for f in families.values()
+        )
+    return reports
+
+
+def _load_factory(target: str) -> StrategyFactory:
+    module, _, attr = target.partition(':')
+    return getattr(importlib.import_module(module), attr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m anvil.validation')
+    parser.add_argument(
+        'strategy', nargs='?',
+        help='module:factory returning a new Strategy to check as well',
+    )
+    args = parser.parse_args(argv)
+
+    checks = default_checks()
+    if args.strategy:
+        signal = StrategySignal(args.strategy, _load_factory(args.strategy))
+        checks.extend(strategy_checks(signal))
+
+    reports = run_checks(checks)
+    for r in reports:
+        status = 'PASS' if r.passed else 'FAIL'
+        print(f'[{status}] {r.name}: {r.reason}')
+        for k, v in r.summary().items():
+            print(f'    {k:>12} = {v:.4f}')
+    return 0 if all(r.passed for r in reports) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,209 @@
+'''
+Walk-forward and rolling-window validation over data loaded once.
+
+The history is held in ArrayEventStore objects. Each fold replays views
+over them instead of loading its own copy, through its own EventSequencer.
+Folds are independent and can run across a process pool, or they can run
+in one pass with a single processor so that warm-up state carries from
+one fold into the next instead of being replayed.
+'''
+from abc import abstractmethod
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable
+import logging
+
+from anvil.clock import SimulationClock
+from anvil.event_processing import EventProcessor, EventScheduler, EventSequencer
+from anvil.event_stores import ArrayEventStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Fold:
+    '''
+    A fold trains (or warms up) over [train_start, test_start) and is
+    evaluated over [test_start, test_end).
+    '''
+    index: int
+    train_start: datetime
+    test_start: datetime
+    test_end: datetime
+
+
+def walk_forward_folds(
+        start: datetime,
+        end: datetime,
+        train: timedelta,
+        test: timedelta,
+        step: timedelta | None = None,
+        anchored: bool = False,
+) -> list[Fold]:
+    '''
+    Rolling folds of a fixed train length, or expanding folds all trained
+    from start when anchored. Test windows advance by step, defaulting to
+    test so they tile [start + train, end) without overlap.
+    '''
+    if step is None:
+        step = test
+    if train <= timedelta(0) or test <= timedelta(0) or step <= timedelta(0):
+        raise ValueError('train, test and step must be positive')
+
+    folds: list[Fold] = []
+    test_start = start + train
+    while test_start + test <= end:
+        folds.append(Fold(
+            index=len(folds),
+            train_start=start if anchored else test_start - train,
+            test_start=test_start,
+            test_end=test_start + test,
+        ))
+        test_start += step
+    return folds
+
+
+class FoldProcessor(EventProcessor):
+    '''
+    EventProcessor driven by the WalkForwardRunner. Events before
+    begin_fold() are the train window of the fold, events between
+    begin_fold() and end_fold() its test window.
+    '''
+    @abstractmethod
+    def begin_fold(self, fold: Fold) -> None:
+        pass
+
+    @abstractmethod
+    def end_fold(self, fold: Fold) -> Any:
+        '''
+        Returns the result of the fold
+        '''
+        pass
+
+
+# builds a processor wired to the clock and scheduler of the fold's run,
+# it must be picklable to run folds in worker processes
+FoldProcessorFactory = Callable[[SimulationClock, EventScheduler], FoldProcessor]
+
+
+@dataclass(frozen=True)
+class FoldResult:
+    fold: Fold
+    result: Any
+
+
+class WalkForwardRunner(object):
+    '''
+    Runs folds over views of the given stores.
+
+    By default every fold gets a fresh processor and replays its own train
+    window, so folds can run in parallel; max_workers of None uses all
+    cores and 1 or less runs in-process. The stores are handed to each
+    worker once, not once per fold.
+
+    With carry_state, a single processor sees the whole span once and the
+    runner marks the fold boundaries on it, so state built up during one
+    fold carries into the next and only the first train window is replayed.
+    Test windows must then be in order and must not overlap.
+    '''
+    def __init__(
+            self,
+            event_stores: list[ArrayEventStore],
+            processor_factory: FoldProcessorFactory,
+            carry_state: bool = False,
+            max_workers: int | None = None,
+    ):
+        self._event_stores = list(event_stores)
+        self._processor_factory = processor_factory
+        self._carry_state = carry_state
+        self._max_workers = max_workers
+
+    def run(self, folds: list[Fold]) -> list[FoldResult]:
+        if not folds:
+            return []
+        if self._carry_state:
+            return self._run_carried(folds)
+        if self._max_workers is not None and self._max_workers <= 1:
+            return [
+                _run_fold(self._event_stores, self._processor_factory, f)
+                for f in folds
+            ]
+
+        with ProcessPoolExecutor(
+            max_workers=self._max_workers,
+            initializer=_init_worker,
+            initargs=(self._event_stores, self._processor_factory),
+        ) as pool:
+            return list(pool.map(_run_fold_in_worker, folds))
+
+    def _run_carried(self, folds: list[Fold]) -> list[FoldResult]:
+        for prev, fold in zip(folds, folds[1:]):
+            if fold.test_start < prev.test_end:
+                raise ValueError(
+                    f'fold {fold.index} test window overlaps fold {prev.index}'
+                )
+
+        first = folds[0]
+        sim_clock = SimulationClock(first.train_start)
+        sequencer = EventSequencer(
+            sim_clock=sim_clock,
+            event_stores=[s.view() for s in self._event_stores],
+            start=first.train_start,
+            end=folds[-1].test_end,
+        )
+        processor = self._processor_factory(sim_clock, sequencer)
+        sequencer.set_processor(processor)
+
+        results: list[FoldResult] = []
+        for fold in folds:
+            results.append(_run_window(sequencer, processor, fold))
+        return results
+
+
+def _run_window(
+        sequencer: EventSequencer,
+        processor: FoldProcessor,
+        fold: Fold,
+) -> FoldResult:
+    sequencer.run(until=fold.test_start)
+    processor.begin_fold(fold)
+    sequencer.run(until=fold.test_end)
+    logger.debug('finished fold', extra={'fold': fold.index})
+    return FoldResult(fold=fold, result=processor.end_fold(fold))
+
+
+def _run_fold(
+        event_stores: list[ArrayEventStore],
+        processor_factory: FoldProcessorFactory,
+        fold: Fold,
+) -> FoldResult:
+    sim_clock = SimulationClock(fold.train_start)
+    sequencer = EventSequencer(
+        sim_clock=sim_clock,
+        event_stores=[
+            s.view(fold.train_start, fold.test_end) for s in event_stores
+        ],
+    )
+    processor = processor_factory(sim_clock, sequencer)
+    sequencer.set_processor(processor)
+    return _run_window(sequencer, processor, fold)
+
+
+# per worker process state, set once by the pool initializer
+_worker_stores: list[ArrayEventStore] = []
+_worker_factory: FoldProcessorFactory | None = None
+
+
+def _init_worker(
+        event_stores: list[ArrayEventStore],
+        processor_factory: FoldProcessorFactory,
+):
+    global _worker_stores, _worker_factory
+    _worker_stores = event_stores
+    _worker_factory = processor_factory
+
+
+def _run_fold_in_worker(fold: Fold) -> FoldResult:
+    assert _worker_factory is not None
+    return _run_fold(_worker_stores, _worker_factory, fold)
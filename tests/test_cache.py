@@ -0,0 +1,269 @@
+from datetime import datetime, timedelta
+import functools
+import importlib.util
+import os
+import sys
+
+import numpy as np
+
+from anvil.cache import ResultCache, run_fingerprint
+from anvil.event_processing import EventStore
+from anvil.event_stores import ArrayEventStore, FileEventStore
+from anvil.events import Event, MarketCloseEvent
+
+
+START = datetime(2023, 1, 2, 16, 0)
+
+
+class UnindexedStore(EventStore):
+    def name(self) -> str:
+        return 'unindexed'
+
+    def peek(self) -> Event | None:
+        return None
+
+    def pop(self) -> Event | None:
+        return None
+
+
+class StrategyA(object):
+    pass
+
+
+class StrategyB(object):
+    pass
+
+
+class PortfolioA(object):
+    pass
+
+
+class PortfolioB(object):
+    pass
+
+
+class ExecutionA(object):
+    pass
+
+
+class ExecutionB(object):
+    pass
+
+
+def _fingerprint(stores, strategy_cls=StrategyA, params=None, **kwargs) -> str | None:
+    return run_fingerprint(
+        stores,
+        strategy_cls,
+        kwargs.pop('portfolio_cls', PortfolioA),
+        kwargs.pop('execution_cls', ExecutionA),
+        params if params is not None else {},
+        **kwargs,
+    )
+
+
+def _get_store(price_shift: float = 0.0) -> ArrayEventStore:
+    events: list[Event] = [
+        MarketCloseEvent(
+            timestamp=START + timedelta(days=i),
+            symbol='SPY',
+            price=100 + i + price_shift,
+            volume=1000,
+        )
+        for i in range(10)
+    ]
+    return ArrayEventStore('close', events)
+
+
+def test_run_fingerprint():
+    params = {'fast': 10, 'slow': 50, 'start': START}
+    key = _fingerprint([_get_store()], StrategyA, params)
+    assert key is not None
+
+    # stable for the same inputs, param order does not matter
+    assert key == _fingerprint(
+        [_get_store()], StrategyA, {'start': START, 'slow': 50, 'fast': 10}
+    )
+
+    # any input change gives a new key
+    assert key != _fingerprint([_get_store(0.5)], StrategyA, params)
+    assert key != _fingerprint([_get_store()], StrategyB, params)
+    assert key != _fingerprint([_get_store()], StrategyA, params, portfolio_cls=PortfolioB)
+    assert key != _fingerprint([_get_store()], StrategyA, params, execution_cls=ExecutionB)
+    assert key != _fingerprint([_get_store()], StrategyA, {**params, 'fast': 5})
+    assert key != _fingerprint([_get_store()], StrategyA, params, engine_version='0.0.0')
+    assert key != _fingerprint(
+        [_get_store().view(START + timedelta(days=1))], StrategyA, params
+    )
+
+    # stores without a fingerprint are not cacheable
+    assert _fingerprint([UnindexedStore()], StrategyA, params) is None
+
+
+def test_run_fingerprint_params():
+    # a large array differing in one element, its repr would elide it
+    a = np.zeros(5000)
+    b = a.copy()
+    b[2500] = 1.0
+    assert repr(a) == repr(b)
+    key = _fingerprint([_get_store()], StrategyA, {'weights': a})
+    assert key is not None
+    assert key == _fingerprint([_get_store()], StrategyA, {'weights': a.copy()})
+    assert key != _fingerprint([_get_store()], StrategyA, {'weights': b})
+
+    # objects without a content digest are not cacheable, their repr has
+    # an address in it
+    assert _fingerprint([_get_store()], StrategyA, {'model': object()}) is None
+
+
+def _load_module(tmp_path, monkeypatch, source: str):
+    path = tmp_path / 'notebook.py'
+    path.write_text(source)
+    spec = importlib.util.spec_from_file_location('notebook', path)
+    assert spec is not None and spec.loader is not None
+    module = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, 'notebook', module)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _load_strategy(tmp_path, monkeypatch, body: str) -> type:
+    source = f'class MyStrategy(object):\n    def on_event(self, event):\n        {body}\n'
+    return _load_module(tmp_path, monkeypatch, source).MyStrategy
+
+
+def test_run_fingerprint_strategy_code(tmp_path, monkeypatch):
+    params = {'fast': 10}
+    original = _load_strategy(tmp_path, monkeypatch, 'return None')
+    key = _fingerprint([_get_store()], original, params)
+    assert key is not None
+
+    # same name and params, edited code
+    edited = _load_strategy(tmp_path, monkeypatch, 'return 1')
+    assert edited.__qualname__ == original.__qualname__
+    assert _fingerprint([_get_store()], edited, params) != key
+
+    # edited on disk but not reloaded, the key follows the loaded code
+    (tmp_path / 'notebook.py').write_text('class MyStrategy(object):\n    pass\n')
+    assert _fingerprint([_get_store()], original, params) == key
+
+    # classes built at runtime have no source file, their code still counts
+    dynamic = type('DynamicStrategy', (object,), {'on_event': lambda self, e: None})
+    assert _fingerprint([_get_store()], dynamic, params) is not None
+
+    # state that cannot be identified is not cacheable
+    opaque = type('OpaqueStrategy', (object,), {'model': object()})
+    assert _fingerprint([_get_store()], opaque, params) is None
+
+
+def _decode(line: str, price_scale: float = 1.0) -> Event:
+    timestamp, symbol, price, volume = line.strip().split(',')
+    return MarketCloseEvent(
+        datetime.fromisoformat(timestamp), symbol, float(price) * price_scale, float(volume)
+    )
+
+
+class _Decoder(object):
+    def __call__(self, line: str) -> Event:
+        return _decode(line)
+
+
+def test_file_event_store_fingerprint(tmp_path, monkeypatch):
+    path = tmp_path / 'close.csv'
+    path.write_text('2023-01-02T16:00:00,SPY,400.0,1000.0\n')
+
+    def other_decode(line: str) -> Event:
+        return _decode(line)
+
+    with FileEventStore('close', str(path), _decode) as store:
+        key = store.fingerprint()
+        assert key is not None
+        assert store.fingerprint() == key
+
+        # the same data decoded differently
+        for decode in [
+            other_decode,
+            functools.partial(_decode, price_scale=2.0),
+            lambda line: _decode(line, 0.5),
+            lambda line: _decode(line, 0.25),
+        ]:
+            with FileEventStore('close', str(path), decode) as other:
+                assert other.fingerprint() != key
+        with FileEventStore('close', str(path), functools.partial(_decode, price_scale=2.0)) as a, \
+                FileEventStore('close', str(path), functools.partial(_decode, price_scale=3.0)) as b:
+            assert a.fingerprint() != b.fingerprint()
+
+        # the decoder edited in a notebook, same name
+        notebook = _load_module(tmp_path, monkeypatch, 'def decode(line):\n    return None\n')
+        with FileEventStore('close', str(path), notebook.decode) as a:
+            notebook = _load_module(tmp_path, monkeypatch, 'def decode(line):\n    return 1\n')
+            with FileEventStore('close', str(path), notebook.decode) as b:
+                assert a.fingerprint() != b.fingerprint()
+
+        # a decoder that cannot be identified is not cacheable
+        with FileEventStore('close', str(path), _Decoder()) as other:
+            assert other.fingerprint() is None
+
+        # a content change is picked up
+        path.write_text('2023-01-02T16:00:00,SPY,401.25,1000.0\n')
+        assert store.fingerprint() != key
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls: list[int] = []
+
+    def run():
+        calls.append(1)
+        return {'sharpe': 1.2, 'equity': [1.0, 1.1]}
+
+    assert cache.get_or_run('k1', run) == {'sharpe': 1.2, 'equity': [1.0, 1.1]}
+    assert cache.get_or_run('k1', run) == {'sharpe': 1.2, 'equity': [1.0, 1.1]}
+    assert len(calls) == 1
+    assert 'k1' in cache
+
+    cache.get_or_run('k1', run, refresh=True)
+    assert len(calls) == 2
+
+    # not cacheable
+    cache.get_or_run(None, run)
+    cache.get_or_run(None, run)
+    assert len(calls) == 4
+
+    cache.clear()
+    assert 'k1' not in cache
+    assert cache.get('k1') is None
+
+
+def test_result_cache_bypass(tmp_path):
+    cache = ResultCache(str(tmp_path / 'off'), enabled=False)
+    calls: list[int] = []
+    cache.get_or_run('k1', lambda: calls.append(1))
+    cache.get_or_run('k1', lambda: calls.append(1))
+    assert len(calls) == 2
+    assert not os.path.exists(tmp_path / 'off')
+
+
+def test_result_cache_lru_eviction(tmp_path):
+    payload = b'x' * 1000
+    cache = ResultCache(str(tmp_path), max_bytes=2500)
+
+    cache.put('k1', payload)
+    cache.put('k2', payload)
+    os.utime(tmp_path / 'k1.pkl', (1, 1))
+    os.utime(tmp_path / 'k2.pkl', (2, 2))
+
+    # touching k1 makes k2 the least recently used
+    assert cache.get('k1') == payload
+    cache.put('k3', payload)
+
+    assert 'k1' in cache
+    assert 'k2' not in cache
+    assert 'k3' in cache
+    assert cache.size_bytes() <= 2500
+
+
+def test_result_cache_unreadable_entry(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    (tmp_path / 'k1.pkl').write_bytes(b'not a pickle')
+    assert cache.get_or_run('k1', lambda: 42) == 42
+    assert cache.get('k1') == 42
@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta
+import pytest
+from anvil.clock import SimulationClock
+from anvil.core import (
+    Execution,
+    FanOutProcessor,
+    MbteProcessor,
+    Portfolio,
+    Strategy,
+)
+from anvil.event_processing import EventScheduler, EventSequencer
+from anvil.event_stores import ArrayEventStore
+from anvil.events import (
+    Event,
+    FillEvent,
+    InternalSchedulingEvent,
+    MarketCloseEvent,
+    MarketOpenEvent,
+    OrderEvent,
+    SignalEvent,
+)
+
+
+START = datetime(2025, 12, 22, 9, 30)
+
+
+class RebalanceEvent(InternalSchedulingEvent):
+    pass
+
+
+class ThresholdStrategy(Strategy):
+    '''
+    Signals long above a price threshold and short below. When given a
+    scheduler, it also schedules a rebalance an hour after each open.
+    '''
+    def __init__(self, threshold: float, scheduler: EventScheduler | None = None):
+        self._threshold = threshold
+        self._scheduler = scheduler
+        self.seen: list[Event] = []
+
+    def on_event(self, event: Event) -> SignalEvent | None:
+        self.seen.append(event)
+        if isinstance(event, MarketOpenEvent) and self._scheduler is not None:
+            self._scheduler.schedule(RebalanceEvent(
+                timestamp=event.timestamp + timedelta(hours=1),
+                symbol=event.symbol,
+            ))
+        if isinstance(event, MarketCloseEvent):
+            value = 1.0 if event.price > self._threshold else -1.0
+            return SignalEvent(event.timestamp, event.symbol, value)
+        return None
+
+
+class FailingStrategy(Strategy):
+    def on_event(self, event: Event) -> SignalEvent | None:
+        raise RuntimeError('boom')
+
+
+class RecordingPortfolio(Portfolio):
+    def __init__(self):
+        self.signals: list[SignalEvent] = []
+
+    def on_signal(self, signal: SignalEvent) -> OrderEvent | None:
+        self.signals.append(signal)
+        return OrderEvent(signal.timestamp, signal.symbol, None, int(signal.value))
+
+    def on_fill(self, fill: FillEvent) -> OrderEvent | None:
+        return None
+
+
+class RecordingExecution(Execution):
+    def __init__(self):
+        self.orders: list[OrderEvent] = []
+
+    def receive(self, order: OrderEvent) -> None:
+        self.orders.append(order)
+
+
+def _get_sequencer() -> EventSequencer:
+    events: list[Event] = []
+    for day in range(3):
+        open_time = START + timedelta(days=day)
+        events.append(MarketOpenEvent(open_time, 'SPY', 100 + day, 1000))
+        events.append(MarketCloseEvent(open_time + timedelta(hours=6), 'SPY', 100.5 + day, 1000))
+    return EventSequencer(
+        sim_clock=SimulationClock(START),
+        event_stores=[ArrayEventStore('market-data', events)],
+    )
+
+
+def test_fan_out_matches_separate_runs():
+    thresholds = [100.0, 101.0, 102.0]
+
+    fan_out_sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(fan_out_sequencer)
+    members = []
+    for threshold in thresholds:
+        triple = (ThresholdStrategy(threshold), RecordingPortfolio(), RecordingExecution())
+        fan_out.add(*triple)
+        members.append(triple)
+    fan_out_sequencer.set_processor(fan_out)
+    fan_out_sequencer.run()
+    assert len(fan_out) == 3
+
+    for threshold, (_, portfolio, execution) in zip(thresholds, members):
+        sequencer = _get_sequencer()
+        expected_portfolio, expected_execution = RecordingPortfolio(), RecordingExecution()
+        sequencer.set_processor(MbteProcessor(
+            ThresholdStrategy(threshold), expected_portfolio, expected_execution
+        ))
+        sequencer.run()
+
+        assert portfolio.signals == expected_portfolio.signals
+        assert execution.orders == expected_execution.orders
+
+    assert [o.qty for o in members[1][2].orders] == [-1, 1, 1]
+
+
+def test_fan_out_isolates_scheduled_events():
+    sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(sequencer)
+
+    scheduling = ThresholdStrategy(100.0)
+    plain = ThresholdStrategy(100.0)
+
+    def build(scheduler: EventScheduler):
+        scheduling._scheduler = scheduler
+        return scheduling, RecordingPortfolio(), RecordingExecution()
+
+    fan_out.add_member(build)
+    fan_out.add(plain, RecordingPortfolio(), RecordingExecution())
+    sequencer.set_processor(fan_out)
+    sequencer.run()
+
+    rebalances = [e for e in scheduling.seen if isinstance(e, RebalanceEvent)]
+    assert [e.timestamp for e in rebalances] == [
+        START + timedelta(days=d, hours=1) for d in range(3)
+    ]
+    # delivered unwrapped, in time order, and only to the member that asked
+    assert scheduling.seen[1] == rebalances[0]
+    assert len(scheduling.seen) == 9
+    assert len(plain.seen) == 6
+
+    # delivered events are no longer tracked, nor can they be cancelled
+    assert fan_out._schedulers[0].pending_count() == 0
+    assert not fan_out._schedulers[0].cancel(0)
+
+
+def test_fan_out_member_schedulers():
+    sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(sequencer)
+    schedulers: list[EventScheduler] = []
+
+    def build(scheduler: EventScheduler):
+        schedulers.append(scheduler)
+        return ThresholdStrategy(100.0), RecordingPortfolio(), RecordingExecution()
+
+    fan_out.add_member(build)
+    fan_out.add_member(build)
+    rebalance = RebalanceEvent(START + timedelta(hours=1), 'SPY')
+    schedule_id = schedulers[0].schedule(rebalance)
+
+    # a member cannot cancel another member's event
+    assert not schedulers[1].cancel(schedule_id)
+    assert schedulers[0].cancel(schedule_id)
+    assert not schedulers[0].cancel(schedule_id)
+
+    # ids are per member, cancelling one's own does not touch the other's
+    ids = [s.schedule(rebalance) for s in schedulers]
+    assert ids[0] != schedule_id and ids[1] == schedule_id
+    assert schedulers[1].cancel(ids[1])
+    fan_out.add(ThresholdStrategy(100.0), RecordingPortfolio(), RecordingExecution())
+    sequencer.set_processor(fan_out)
+    sequencer.run()
+    assert fan_out._schedulers[0].pending_count() == 0
+
+
+def test_fan_out_rejects_unowned_scheduled_events():
+    sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(sequencer)
+    # built with the sequencer itself instead of a member scheduler
+    fan_out.add(ThresholdStrategy(100.0, sequencer), RecordingPortfolio(), RecordingExecution())
+    fan_out.add(ThresholdStrategy(100.0), RecordingPortfolio(), RecordingExecution())
+    sequencer.set_processor(fan_out)
+    with pytest.raises(ValueError):
+        sequencer.run()
+
+
+def test_fan_out_errors():
+    sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(sequencer)
+    fan_out.add(FailingStrategy(), RecordingPortfolio(), RecordingExecution())
+    sequencer.set_processor(fan_out)
+    with pytest.raises(RuntimeError):
+        sequencer.run()
+
+    sequencer = _get_sequencer()
+    fan_out = FanOutProcessor(sequencer, isolate_errors=True)
+    fan_out.add(FailingStrategy(), RecordingPortfolio(), RecordingExecution())
+    healthy = ThresholdStrategy(100.0)
+    fan_out.add(healthy, RecordingPortfolio(), RecordingExecution())
+    sequencer.set_processor(fan_out)
+    sequencer.run()
+
+    assert list(fan_out.errors()) == [0]
+    assert isinstance(fan_out.errors()[0], RuntimeError)
+    assert len(healthy.seen) == 6
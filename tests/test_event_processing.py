@@ -1,4 +1,5 @@
 from datetime import datetime
+import pytest
 from anvil.clock import SimulationClock
 from anvil.event_processing import (
     EventProcessor, 
@@ -411,3 +412,89 @@ class TestEventSequencer(object):
         sequencer.run()
         assert event_processor.get_processed_events() == self.EXPECTED_EXECUTION_SEQUENCE_WITH_INTERNAL
 
+
+
+class TestEventSequencerWindow(object):
+    EVENTS: list[Event] = TestEventSequencer.MARKET_DATA_EVENTS
+    PORTFOLIO_EVENTS: list[Event] = TestEventSequencer.PORTFOLIO_EVENT_DATA
+
+    def _run(self, start: datetime | None, end: datetime | None) -> list[Event]:
+        sequencer = EventSequencer(
+            sim_clock=SimulationClock(datetime(2025, 12, 24, 8, 30)),
+            event_stores=[
+                MockEventStore('market-data', self.EVENTS),
+                MockEventStore('portfolio-data', self.PORTFOLIO_EVENTS),
+            ],
+            start=start,
+            end=end,
+        )
+        event_processor = MockStandardEventProcessor()
+        sequencer.set_processor(event_processor)
+        sequencer.run()
+        return event_processor.get_processed_events()
+
+    def test_default_seek(self):
+        store = MockEventStore('market-data', self.EVENTS)
+        store.seek(datetime(2025, 12, 24, 13, 0))
+        assert store.peek() == self.EVENTS[1]
+        store.seek(datetime(2025, 12, 26, 0, 0))
+        assert store.peek() == self.EVENTS[2]
+
+    def test_start_and_end(self):
+        assert self._run(
+            start=datetime(2025, 12, 26, 0, 0),
+            end=None,
+        ) == TestEventSequencer.EXPECTED_EXECUTION_SEQUENCE_NO_INTERNAL[4:]
+
+        assert self._run(
+            start=None,
+            end=datetime(2025, 12, 24, 13, 1),
+        ) == TestEventSequencer.EXPECTED_EXECUTION_SEQUENCE_NO_INTERNAL[:3]
+
+        assert self._run(
+            start=datetime(2025, 12, 24, 9, 30),
+            end=datetime(2025, 12, 26, 9, 30),
+        ) == TestEventSequencer.EXPECTED_EXECUTION_SEQUENCE_NO_INTERNAL[1:5]
+
+    def test_scheduled_event_past_end(self):
+        sequencer = EventSequencer(
+            sim_clock=SimulationClock(datetime(2025, 12, 24, 8, 30)),
+            event_stores=[],
+            end=datetime(2025, 12, 24, 11, 30),
+        )
+        event_processor = MockStandardEventProcessor()
+        sequencer.set_processor(event_processor)
+
+        internal = TestEventSequencer.INTERNAL_SCHEDULING_EVENTS
+        sequencer.schedule(internal[0]) # at end, excluded
+        sequencer.schedule(internal[1])
+        sequencer.run()
+        assert event_processor.get_processed_events() == [internal[1]]
+
+    def test_invalid_window(self):
+        with pytest.raises(ValueError):
+            EventSequencer(
+                sim_clock=SimulationClock(datetime(2025, 12, 24, 8, 30)),
+                event_stores=[],
+                start=datetime(2025, 12, 26),
+                end=datetime(2025, 12, 24),
+            )
+
+    def test_run_until(self):
+        sequencer = EventSequencer(
+            sim_clock=SimulationClock(datetime(2025, 12, 24, 8, 30)),
+            event_stores=[
+                MockEventStore('market-data', self.EVENTS),
+                MockEventStore('portfolio-data', self.PORTFOLIO_EVENTS),
+            ],
+        )
+        event_processor = MockStandardEventProcessor()
+        sequencer.set_processor(event_processor)
+
+        expected = TestEventSequencer.EXPECTED_EXECUTION_SEQUENCE_NO_INTERNAL
+        sequencer.run(until=datetime(2025, 12, 26, 9, 29))
+        assert event_processor.get_processed_events() == expected[:4]
+
+        # resumes where it stopped
+        sequencer.run()
+        assert event_processor.get_processed_events() == expected
@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta
+import dataclasses
+import functools
+import os
+
+from anvil.event_stores import (
+    ArrayEventStore,
+    FileEventStore,
+    SparseTimestampIndex,
+)
+from anvil.events import Event, MarketCloseEvent
+
+
+START = datetime(2023, 1, 2, 16, 0)
+
+
+def _close_events(n: int) -> list[Event]:
+    return [
+        MarketCloseEvent(
+            timestamp=START + timedelta(days=i),
+            symbol='SPY',
+            price=400 + i,
+            volume=1000,
+        )
+        for i in range(n)
+    ]
+
+
+def _encode(event: MarketCloseEvent) -> str:
+    return f'{event.timestamp.isoformat()},{event.symbol},{event.price},{event.volume}\n'
+
+
+def _decode(line: str) -> Event:
+    timestamp, symbol, price, volume = line.strip().split(',')
+    return MarketCloseEvent(
+        timestamp=datetime.fromisoformat(timestamp),
+        symbol=symbol,
+        price=float(price),
+        volume=float(volume),
+    )
+
+
+def _drain(store) -> list[Event]:
+    events = []
+    while store.peek() is not None:
+        events.append(store.pop())
+    return events
+
+
+def test_sparse_timestamp_index():
+    index = SparseTimestampIndex()
+    assert index.lower_bound(START) == 0
+
+    index.add(START, 0)
+    index.add(START + timedelta(days=4), 4)
+    index.add(START + timedelta(days=8), 8)
+    assert len(index) == 3
+
+    assert index.lower_bound(START - timedelta(days=1)) == 0
+    assert index.lower_bound(START) == 0
+    assert index.lower_bound(START + timedelta(days=4)) == 0
+    assert index.lower_bound(START + timedelta(days=5)) == 4
+    assert index.lower_bound(START + timedelta(days=100)) == 8
+
+
+def test_array_event_store_seek():
+    events = _close_events(20)
+    store = ArrayEventStore('close', events, index_stride=3)
+    assert store.name() == 'close'
+
+    store.seek(START + timedelta(days=7))
+    assert store.pop() == events[7]
+    assert store.peek() == events[8]
+
+    # seeking between events lands on the next one
+    store.seek(START + timedelta(days=10, hours=1))
+    assert store.peek() == events[11]
+
+    # seeking backward rewinds
+    store.seek(START - timedelta(days=1))
+    assert _drain(store) == events
+
+    store.seek(START + timedelta(days=20))
+    assert store.peek() is None
+
+
+def test_file_event_store_seek(tmp_path):
+    events = _close_events(20)
+    path = tmp_path / 'close.csv'
+    path.write_text(''.join(_encode(e) for e in events))  # type: ignore
+
+    store = FileEventStore('close', str(path), _decode, index_stride=3)
+    assert store.peek() == events[0]
+    assert store.pop() == events[0]
+
+    store.seek(START + timedelta(days=13))
+    assert _drain(store) == events[13:]
+
+    # a shared pre-built index
+    index = FileEventStore.build_index(str(path), _decode, index_stride=4)
+    assert len(index) == 5
+    other = FileEventStore('close', str(path), _decode, index=index)
+    other.seek(START + timedelta(days=5, hours=1))
+    assert _drain(other) == events[6:]
+
+    store.close()
+    other.close()
+
+
+_decoded: list[str] = []
+
+
+def _counting_decode(line: str) -> Event:
+    _decoded.append(line)
+    return _decode(line)
+
+
+def test_file_event_store_sidecar_index(tmp_path):
+    events = _close_events(40)
+    path = tmp_path / 'close.csv'
+    path.write_text(''.join(_encode(e) for e in events))  # type: ignore
+    sidecar = tmp_path / ('close.csv' + FileEventStore.INDEX_SUFFIX)
+
+    with FileEventStore('close', str(path), _decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert store.peek() == events[30]
+    assert sidecar.exists()
+
+    # a new store loads the sidecar
+    with FileEventStore('close', str(path), _decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert _drain(store) == events[30:]
+    assert store._file.closed
+
+    # a different decoder rebuilds the index, later stores only decode
+    # around their window
+    with FileEventStore('close', str(path), _counting_decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+    assert len(_decoded) > 10
+    _decoded.clear()
+    with FileEventStore('close', str(path), _counting_decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert store.peek() == events[30]
+    # the head at open, then at most one stride up to the target
+    assert len(_decoded) <= 1 + 4 + 1
+
+    # changing the data rebuilds the index
+    path.write_text(''.join(_encode(e) for e in events[10:]))  # type: ignore
+    with FileEventStore('close', str(path), _decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert _drain(store) == events[30:]
+
+
+def _relabel_decode(symbol: str, line: str) -> Event:
+    _decoded.append(line)
+    return dataclasses.replace(_decode(line), symbol=symbol)
+
+
+def test_file_event_store_sidecar_partial_decoders(tmp_path):
+    events = _close_events(40)
+    path = tmp_path / 'close.csv'
+    path.write_text(''.join(_encode(e) for e in events))  # type: ignore
+
+    spy = functools.partial(_relabel_decode, 'SPY')
+    qqq = functools.partial(_relabel_decode, 'QQQ')
+    with FileEventStore('close', str(path), spy, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+
+    # same function, different arguments, the index is rebuilt
+    _decoded.clear()
+    with FileEventStore('close', str(path), qqq, index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert store.peek().symbol == 'QQQ'  # type: ignore
+    assert len(_decoded) > 10
+
+    # a callable object cannot be identified, its index is not saved
+    sidecar = tmp_path / ('close.csv' + FileEventStore.INDEX_SUFFIX)
+    sidecar.unlink()
+    with FileEventStore('close', str(path), _Decoder(), index_stride=4) as store:
+        store.seek(START + timedelta(days=30))
+        assert store.peek() == events[30]
+    assert not sidecar.exists()
+
+
+class _Decoder(object):
+    def __call__(self, line: str) -> Event:
+        return _decode(line)
+
+
+def test_file_event_store_sidecar_write_failure(tmp_path, monkeypatch):
+    events = _close_events(10)
+    path = tmp_path / 'close.csv'
+    path.write_text(''.join(_encode(e) for e in events))  # type: ignore
+
+    def fail(src, dst):
+        raise OSError('read-only')
+    monkeypatch.setattr(os, 'replace', fail)
+
+    with FileEventStore('close', str(path), _decode, index_stride=4) as store:
+        store.seek(START + timedelta(days=5))
+        assert store.peek() == events[5]
+    # the index is still used, and the temporary file is gone
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['close.csv']
+
+
+def test_array_event_store_view():
+    events = _close_events(20)
+    store = ArrayEventStore('close', events, index_stride=3)
+    store.pop()
+
+    view = store.view(START + timedelta(days=5), START + timedelta(days=12))
+    assert view.name() == 'close'
+    assert _drain(view) == events[5:12]
+    # the parent cursor is untouched
+    assert store.peek() == events[1]
+
+    # seeking stays inside the view
+    view.seek(START)
+    assert view.peek() == events[5]
+    view.seek(START + timedelta(days=15))
+    assert view.peek() is None
+
+    # a view of a view is bounded by both
+    inner = view.view(START + timedelta(days=10), START + timedelta(days=30))
+    assert _drain(inner) == events[10:12]
+
+    empty = store.view(START + timedelta(days=12), START + timedelta(days=5))
+    assert empty.peek() is None
@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+import pytest
+from anvil.clock import SimulationClock
+from anvil.event_processing import EventScheduler, EventStore
+from anvil.event_stores import ArrayEventStore
+from anvil.events import EquityEvent, Event, FillEvent, MarketCloseEvent
+from anvil.partitioned import (
+    PartitionedResult,
+    PartitionedRunner,
+    ShardProcessor,
+    merge_records,
+    shard_symbols,
+)
+
+
+START = datetime(2024, 1, 2, 16, 0)
+SYMBOLS = ['AAPL', 'IBM', 'MSFT', 'SPY', 'TLT']
+
+
+def load_stores(symbols: list[str]) -> list[EventStore]:
+    stores: list[EventStore] = []
+    for symbol in symbols:
+        seed = sum(ord(c) for c in symbol)
+        events: list[Event] = [
+            MarketCloseEvent(
+                timestamp=START + timedelta(days=i),
+                symbol=symbol,
+                price=100 + ((seed * (i + 1)) % 7) - 3,
+                volume=1000,
+            )
+            for i in range(20)
+        ]
+        stores.append(ArrayEventStore(symbol, events))
+    return stores
+
+
+class FollowProcessor(ShardProcessor):
+    '''
+    Goes long one unit after an up close and flat after a down close,
+    filling at the close and marking equity on every close
+    '''
+    def __init__(self, clock: SimulationClock, scheduler: EventScheduler):
+        self._last: dict[str, float] = {}
+        self._position: dict[str, int] = {}
+        self._pnl: dict[str, float] = {}
+        self._records: list[Event] = []
+
+    def process(self, event: Event) -> None:
+        if not isinstance(event, MarketCloseEvent):
+            return
+        s = event.symbol
+        position = self._position.get(s, 0)
+        if s in self._last:
+            self._pnl[s] = self._pnl.get(s, 0.0) + position * (event.price - self._last[s])
+            target = 1 if event.price > self._last[s] else 0
+            if target != position:
+                self._records.append(FillEvent(event.timestamp, s, event.price, target - position))
+                self._position[s] = target
+        self._last[s] = event.price
+        self._records.append(EquityEvent(event.timestamp, s, self._pnl.get(s, 0.0)))
+
+    def records(self) -> list[Event]:
+        return self._records
+
+
+class LeakingProcessor(FollowProcessor):
+    def records(self) -> list[Event]:
+        return [EquityEvent(START, 'OTHER', 0.0)]
+
+
+def _runner(max_workers: int | None, factory=FollowProcessor) -> PartitionedRunner:
+    return PartitionedRunner(
+        symbols=SYMBOLS,
+        store_factory=load_stores,
+        processor_factory=factory,
+        init_time=START,
+        max_workers=max_workers,
+    )
+
+
+def test_shard_symbols():
+    assert shard_symbols(['b', 'a', 'c', 'd', 'a'], 3) == [['a', 'd'], ['b'], ['c']]
+    assert shard_symbols(['a', 'b'], 8) == [['a'], ['b']]
+
+
+def test_merge_records():
+    t0, t1 = START, START + timedelta(days=1)
+    a0, a1 = EquityEvent(t0, 'A', 1.0), EquityEvent(t1, 'A', 2.0)
+    b0 = FillEvent(t0, 'B', 10.0, 1)
+    b1 = EquityEvent(t0, 'B', 3.0)
+    assert merge_records(['B', 'A'], [[b0, b1], [a0, a1]]) == [a0, b0, b1, a1]
+
+    with pytest.raises(ValueError):
+        merge_records(['A'], [[b0]])
+
+
+def test_equity_curve():
+    t0, t1 = START, START + timedelta(days=1)
+    result = PartitionedResult(symbols=['A', 'B'], records=[
+        EquityEvent(t0, 'A', 1.0),
+        EquityEvent(t0, 'B', 2.0),
+        FillEvent(t1, 'A', 10.0, 1),
+        EquityEvent(t1, 'A', 4.0),
+    ])
+    assert result.equity_curve() == [(t0, 3.0), (t1, 6.0)]
+
+
+def test_partitioned_matches_single_process():
+    single = _runner(max_workers=1).run()
+    partitioned = _runner(max_workers=3).run()
+
+    assert partitioned.records == single.records
+    assert partitioned.equity_curve() == single.equity_curve()
+
+    curve = single.equity_curve()
+    assert len(curve) == 20
+    assert curve[-1][1] == sum(
+        [r for r in single.by_symbol(s) if isinstance(r, EquityEvent)][-1].equity
+        for s in SYMBOLS
+    )
+    assert any(isinstance(r, FillEvent) for r in single.records)
+
+
+def test_partitioned_rejects_cross_symbol_records():
+    with pytest.raises(ValueError):
+        _runner(max_workers=1, factory=LeakingProcessor).run()
@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from anvil.events import FillEvent, MarketCloseEvent
+from anvil.risk import RiskEngine
+
+
+START = datetime(2024, 1, 2, 16, 0)
+DECAY = 0.9
+
+
+def _prices(n_symbols: int, n_steps: int) -> np.ndarray:
+    rng = np.random.default_rng(3)
+    returns = rng.normal(0.0, 0.02, size=(n_steps, n_symbols))
+    return 50.0 * np.cumprod(1.0 + returns, axis=0)
+
+
+def _close(day: int, symbol: str, price: float) -> MarketCloseEvent:
+    return MarketCloseEvent(START + timedelta(days=day), symbol, float(price), 1000)
+
+
+def _brute_force_cov(prices: np.ndarray) -> np.ndarray:
+    n = prices.shape[1]
+    cov = np.zeros((n, n))
+    for t in range(1, len(prices)):
+        r = prices[t] / prices[t - 1] - 1.0
+        cov = DECAY * cov + (1.0 - DECAY) * np.outer(r, r)
+    return cov
+
+
+def test_covariance_matches_brute_force():
+    # more symbols than the initial capacity
+    symbols = [f'S{i:02d}' for i in range(20)]
+    prices = _prices(len(symbols), 30)
+
+    engine = RiskEngine(decay=DECAY)
+    for day, row in enumerate(prices):
+        for s, p in zip(symbols, row):
+            engine.on_close(_close(day, s, p))
+    engine.flush()
+
+    expected = _brute_force_cov(prices)
+    assert engine.update_count() == 30
+    assert engine.symbols() == symbols
+    assert engine.covariance('S03', 'S07') == pytest.approx(expected[3, 7])
+    assert engine.volatility('S05') == pytest.approx(np.sqrt(expected[5, 5]))
+    assert engine.covariance('S03', 'UNKNOWN') == 0.0
+
+
+def test_exposure_and_portfolio_risk():
+    symbols = ['AAPL', 'IBM', 'MSFT']
+    prices = _prices(len(symbols), 10)
+    engine = RiskEngine(decay=DECAY, symbols=symbols)
+
+    qty = np.zeros(len(symbols))
+    for day, row in enumerate(prices):
+        for s, p in zip(symbols, row):
+            engine.on_close(_close(day, s, p))
+        if day == 5:
+            engine.flush()
+            # sizing query before the fill matches the variance after it
+            for i, q in [(0, 10), (1, -30)]:
+                predicted = engine.variance_after(symbols[i], q)
+                engine.on_fill(FillEvent(START + timedelta(days=day), symbols[i], row[i], q))
+                qty[i] += q
+                assert engine.portfolio_variance() == pytest.approx(predicted)
+    engine.flush()
+
+    x = qty * prices[-1]
+    cov = _brute_force_cov(prices)
+    assert engine.position('IBM') == -30
+    assert engine.exposure('AAPL') == pytest.approx(x[0])
+    assert engine.gross_exposure() == pytest.approx(np.abs(x).sum())
+    assert engine.net_exposure() == pytest.approx(x.sum())
+    assert engine.weight('IBM') == pytest.approx(x[1] / np.abs(x).sum())
+    assert engine.weights() == pytest.approx(dict(zip(symbols, x / np.abs(x).sum())))
+    assert engine.portfolio_volatility() == pytest.approx(np.sqrt(x @ cov @ x))
+
+    # O(1) updates between closes agree with a full recomputation
+    engine.on_fill(FillEvent(START + timedelta(days=20), 'MSFT', prices[-1, 2], 5))
+    x[2] += 5 * prices[-1, 2]
+    assert engine.portfolio_variance() == pytest.approx(x @ cov @ x)
+    assert engine.gross_exposure() == pytest.approx(np.abs(x).sum())
+
+
+def test_closes_are_batched_per_timestamp():
+    engine = RiskEngine(decay=DECAY)
+    engine.on_close(_close(0, 'A', 100.0))
+    engine.on_close(_close(0, 'B', 100.0))
+    engine.on_close(_close(1, 'A', 110.0))
+    assert engine.update_count() == 1
+    # the second timestamp is still pending
+    assert engine.volatility('A') == 0.0
+
+    engine.on_close(_close(1, 'B', 90.0))
+    engine.flush()
+    assert engine.update_count() == 2
+    assert engine.covariance('A', 'B') == pytest.approx((1.0 - DECAY) * 0.1 * -0.1)
+
+
+def test_flush_within_a_timestamp():
+    engine = RiskEngine(decay=DECAY)
+    engine.on_close(_close(0, 'A', 100.0))
+    engine.on_close(_close(0, 'B', 100.0))
+    engine.on_close(_close(1, 'A', 110.0))
+    engine.flush()
+    assert engine.covariance('A', 'A') == pytest.approx((1.0 - DECAY) * 0.1 ** 2)
+
+    # the rest of the timestamp amends the same update
+    engine.on_close(_close(1, 'B', 90.0))
+    engine.flush()
+    assert engine.update_count() == 2
+    assert engine.covariance('A', 'B') == pytest.approx((1.0 - DECAY) * 0.1 * -0.1)
+    assert engine.covariance('A', 'A') == pytest.approx((1.0 - DECAY) * 0.1 ** 2)
+
+    # a repeated close replaces the earlier one of the timestamp
+    engine.on_close(_close(1, 'A', 120.0))
+    engine.flush()
+    assert engine.update_count() == 2
+    assert engine.covariance('A', 'A') == pytest.approx((1.0 - DECAY) * 0.2 ** 2)
+    assert engine.covariance('A', 'B') == pytest.approx((1.0 - DECAY) * 0.2 * -0.1)
+
+    engine.on_close(_close(2, 'A', 132.0))
+    engine.flush()
+    assert engine.update_count() == 3
+    assert engine.covariance('A', 'A') == pytest.approx(
+        DECAY * (1.0 - DECAY) * 0.2 ** 2 + (1.0 - DECAY) * 0.1 ** 2
+    )
+
+
+def test_fill_before_first_close_is_not_a_return():
+    engine = RiskEngine(decay=DECAY)
+    engine.on_close(_close(0, 'A', 100.0))
+    engine.on_fill(FillEvent(START, 'A', 95.0, 10))
+    assert engine.exposure('A') == 950.0
+    engine.flush()
+
+    assert engine.volatility('A') == 0.0
+    assert engine.exposure('A') == 1000.0
+
+    engine.on_close(_close(1, 'A', 110.0))
+    engine.flush()
+    assert engine.covariance('A', 'A') == pytest.approx((1.0 - DECAY) * 0.1 ** 2)
+
+
+def test_empty_engine():
+    engine = RiskEngine()
+    assert engine.gross_exposure() == 0.0
+    assert engine.weight('A') == 0.0
+    assert engine.weights() == {}
+    assert engine.portfolio_volatility() == 0.0
+    assert engine.variance_after('A', 10) == 0.0
+    with pytest.raises(ValueError):
+        RiskEngine(decay=1.0)
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+import pytest
+from anvil.clock import SimulationClock
+from anvil.event_processing import EventScheduler, EventStore
+from anvil.event_stores import ArrayEventStore
+from anvil.events import EquityEvent, Event, FillEvent, MarketCloseEvent
+from anvil.time_sliced import ChunkProcessor, TimeSlicedRunner, time_chunks
+
+
+START = datetime(2024, 1, 1, 16, 0)
+END = START + timedelta(days=60)
+LOOKBACK = 3
+
+
+def load_stores() -> list[EventStore]:
+    stores: list[EventStore] = []
+    for k, symbol in enumerate(['IBM', 'SPY']):
+        events: list[Event] = [
+            MarketCloseEvent(
+                timestamp=START + timedelta(days=i),
+                symbol=symbol,
+                price=float(100 + ((i * (k + 3)) % 11)),
+                volume=1000,
+            )
+            for i in range(60)
+        ]
+        stores.append(ArrayEventStore(symbol, events))
+    return stores
+
+
+class MomentumProcessor(ChunkProcessor):
+    '''
+    Holds one unit while the close is above the close LOOKBACK days ago
+    '''
+    def __init__(self, clock: SimulationClock, scheduler: EventScheduler):
+        self._prices: dict[str, list[float]] = {}
+        self._position: dict[str, int] = {}
+        self._pnl: dict[str, float] = {}
+        self._records: list[Event] = []
+
+    def process(self, event: Event) -> None:
+        if not isinstance(event, MarketCloseEvent):
+            return
+        s = event.symbol
+        prices = self._prices.setdefault(s, [])
+        position = self._position.get(s, 0)
+        if prices:
+            self._pnl[s] = self._pnl.get(s, 0.0) + position * (event.price - prices[-1])
+        prices.append(event.price)
+        del prices[:-(LOOKBACK + 1)]
+
+        target = 1 if len(prices) > LOOKBACK and prices[-1] > prices[0] else 0
+        if target != position:
+            self._records.append(FillEvent(event.timestamp, s, event.price, target - position))
+            self._position[s] = target
+        self._records.append(EquityEvent(event.timestamp, s, self._pnl.get(s, 0.0)))
+
+    def records(self) -> list[Event]:
+        return list(self._records)
+
+    def state(self):
+        return (
+            {s: p for s, p in self._position.items() if p != 0},
+            {s: tuple(p) for s, p in self._prices.items()},
+        )
+
+
+def _run(n_chunks: int, warmup: timedelta, max_workers: int | None = 1):
+    return TimeSlicedRunner(
+        store_factory=load_stores,
+        processor_factory=MomentumProcessor,
+        start=START,
+        end=END,
+        n_chunks=n_chunks,
+        warmup=warmup,
+        max_workers=max_workers,
+    ).run()
+
+
+def test_time_chunks():
+    assert time_chunks(START, START + timedelta(days=9), 3) == [
+        (START, START + timedelta(days=3)),
+        (START + timedelta(days=3), START + timedelta(days=6)),
+        (START + timedelta(days=6), START + timedelta(days=9)),
+    ]
+    with pytest.raises(ValueError):
+        time_chunks(START, START, 2)
+    with pytest.raises(ValueError):
+        time_chunks(START, END, 0)
+
+
+def test_stitched_matches_serial():
+    serial = _run(n_chunks=1, warmup=timedelta(0))
+    assert serial.boundaries == []
+
+    sliced = _run(n_chunks=4, warmup=timedelta(days=LOOKBACK + 1), max_workers=4)
+    assert sliced.converged()
+    assert len(sliced.boundaries) == 3
+    assert sliced.records == serial.records
+    assert sliced.equity_curve() == serial.equity_curve()
+    assert sliced.symbols == ['IBM', 'SPY']
+
+
+def test_short_warmup_is_flagged():
+    sliced = _run(n_chunks=4, warmup=timedelta(days=1))
+    assert not sliced.converged()
+    assert [b.timestamp for b in sliced.boundaries] == [
+        START + timedelta(days=15),
+        START + timedelta(days=30),
+        START + timedelta(days=45),
+    ]
+    assert all(not b.converged for b in sliced.boundaries)
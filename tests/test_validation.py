@@ -0,0 +1,155 @@
+import numpy as np
+from anvil import validation
+from anvil.core import Strategy
+from anvil.events import Event, MarketCloseEvent, SignalEvent
+from anvil.validation import (
+    EngineAgreementCheck,
+    KnownFailureCheck,
+    MonteCarloConfig,
+    MovingAverageCrossover,
+    PathMetrics,
+    RandomSignal,
+    RandomSignalCheck,
+    StrategySignal,
+    ZeroSignalCheck,
+    random_walk_paths,
+    run_checks,
+    run_monte_carlo,
+    simulate,
+    strategy_checks,
+)
+
+
+SMALL_CONFIG = MonteCarloConfig(n_paths=600, batch_size=200, max_workers=1)
+
+
+def test_random_walk_paths():
+    rng = np.random.default_rng(7)
+    prices = random_walk_paths(rng, n_paths=3, n_steps=10, start_price=50.0)
+    assert prices.shape == (3, 10)
+    assert np.all(prices[:, 0] == 50.0)
+    assert np.all(prices > 0)
+
+
+def test_simulate_lag_and_costs():
+    prices = np.array([[100.0, 101.0, 103.0, 102.0]])
+    signals = np.array([[1.0, 1.0, -1.0, 0.0]])
+
+    metrics = simulate(prices, signals, cost_rate=0.01)
+
+    # buy 1 at 101, hold to 103 then 102, flip to -1 at 102 (trading 2)
+    assert np.allclose(metrics.costs, [1.01 + 2.04])
+    assert np.allclose(metrics.pnl, [2.0 - 1.0 - 1.01 - 2.04])
+
+
+def test_trailing_mean_uses_past_prices_only():
+    prices = np.array([[1.0, 2.0, 3.0, 4.0, 100.0]])
+    positions = MovingAverageCrossover(fast=1, slow=3).positions(prices, None)  # type: ignore
+    # flat before the slow window fills, last step sees the jump
+    assert positions.tolist() == [[0.0, 0.0, 1.0, 1.0, 1.0]]
+    prices[0, 4] = -100.0
+    positions = MovingAverageCrossover(fast=1, slow=3).positions(prices, None)  # type: ignore
+    assert positions.tolist() == [[0.0, 0.0, 1.0, 1.0, -1.0]]
+
+
+def test_default_checks_pass():
+    reports = run_checks(config=SMALL_CONFIG, engine_paths=5)
+    assert [r.name for r in reports] == [
+        'zero-signal',
+        'random-signal',
+        'known-failure',
+        'engine-agreement-zero',
+        'engine-agreement-random',
+        'engine-agreement-ma-crossover-10-50',
+    ]
+    for r in reports:
+        assert r.passed, r.reason
+    for r in reports[:3]:
+        assert len(r.metrics.pnl) == SMALL_CONFIG.n_paths
+    assert len(reports[3].metrics.pnl) == 5
+
+
+class MomentumStrategy(Strategy):
+    '''
+    Long after an up close, short after a down close, silent otherwise
+    '''
+    def __init__(self):
+        self._last: float | None = None
+
+    def on_event(self, event: Event) -> SignalEvent | None:
+        assert isinstance(event, MarketCloseEvent)
+        last, self._last = self._last, event.price
+        if last is None or event.price == last:
+            return None
+        return SignalEvent(event.timestamp, event.symbol, 1.0 if event.price > last else -1.0)
+
+
+def test_strategy_signal_runs_strategy_per_path():
+    rng = np.random.default_rng(5)
+    prices = random_walk_paths(rng, n_paths=4, n_steps=30)
+    prices[:, 10] = prices[:, 9]
+
+    positions = StrategySignal('momentum', MomentumStrategy).positions(prices, rng)
+
+    expected = np.zeros_like(prices)
+    expected[:, 1:] = np.sign(np.diff(prices, axis=1))
+    # no signal on an unchanged close, the position is held
+    expected[:, 10] = expected[:, 9]
+    assert np.array_equal(positions, expected)
+
+
+def test_strategy_checks():
+    signal = StrategySignal('momentum', MomentumStrategy)
+    reports = run_checks(strategy_checks(signal), SMALL_CONFIG, engine_paths=5)
+    assert [r.name for r in reports] == [
+        'known-failure-momentum', 'engine-agreement-momentum',
+    ]
+    for r in reports:
+        assert r.passed, r.reason
+
+
+def test_engine_agreement_flags_model_drift(monkeypatch):
+    check = EngineAgreementCheck(RandomSignal(), n_paths=5)
+    assert check.run(SMALL_CONFIG).passed
+
+    # a vectorized model that trades on the signal step, without the lag
+    def unlagged(prices, signals, cost_rate):
+        shifted = np.zeros_like(signals)
+        shifted[:, :-1] = signals[:, 1:]
+        return simulate(prices, shifted, cost_rate)
+    monkeypatch.setattr(validation, 'simulate', unlagged)
+
+    report = check.run(SMALL_CONFIG)
+    assert not report.passed
+    assert 'differs from the engine' in report.reason
+
+
+def test_checks_flag_failures():
+    leaking = PathMetrics(
+        pnl=np.full(100, 5.0) + np.linspace(-1, 1, 100),
+        costs=np.ones(100),
+        sharpe=np.full(100, 1.5),
+    )
+    assert not ZeroSignalCheck().evaluate(leaking)[0]
+    assert not RandomSignalCheck().evaluate(leaking)[0]
+    assert not KnownFailureCheck().evaluate(leaking)[0]
+
+    # a leak that only breaks even after costs is still alpha
+    masked = PathMetrics(
+        pnl=np.linspace(-1, 1, 100),
+        costs=np.full(100, 5.0),
+        sharpe=np.zeros(100),
+    )
+    assert not KnownFailureCheck().evaluate(masked)[0]
+
+
+def test_process_pool_matches_in_process():
+    signals = [MovingAverageCrossover(5, 20)]
+    serial = run_monte_carlo(signals, SMALL_CONFIG)
+    pooled = run_monte_carlo(
+        signals,
+        MonteCarloConfig(n_paths=600, batch_size=200, max_workers=2),
+    )
+    name = signals[0].name()
+    assert np.array_equal(serial[name].pnl, pooled[name].pnl)
+    assert np.array_equal(serial[name].sharpe, pooled[name].sharpe)
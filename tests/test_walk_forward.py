@@ -0,0 +1,126 @@
+from datetime import datetime, timedelta
+import pytest
+from anvil.clock import SimulationClock
+from anvil.event_processing import EventScheduler
+from anvil.event_stores import ArrayEventStore
+from anvil.events import Event, MarketCloseEvent
+from anvil.walk_forward import (
+    Fold,
+    FoldProcessor,
+    WalkForwardRunner,
+    walk_forward_folds,
+)
+
+
+START = datetime(2023, 1, 1, 16, 0)
+
+
+class CountingProcessor(FoldProcessor):
+    '''
+    Counts events seen in the train and test windows of each fold, and
+    overall since construction
+    '''
+    def __init__(self, clock: SimulationClock, scheduler: EventScheduler):
+        self._clock = clock
+        self._seen = 0
+        self._train = 0
+        self._test = 0
+        self._testing = False
+
+    def process(self, event: Event) -> None:
+        self._seen += 1
+        if self._testing:
+            self._test += 1
+        else:
+            self._train += 1
+
+    def begin_fold(self, fold: Fold) -> None:
+        self._testing = True
+
+    def end_fold(self, fold: Fold):
+        result = (self._train, self._test, self._seen, self._clock.now())
+        self._train, self._test, self._testing = 0, 0, False
+        return result
+
+
+def _get_store() -> ArrayEventStore:
+    events: list[Event] = [
+        MarketCloseEvent(
+            timestamp=START + timedelta(days=i),
+            symbol='SPY',
+            price=100 + i,
+            volume=1000,
+        )
+        for i in range(100)
+    ]
+    return ArrayEventStore('close', events, index_stride=8)
+
+
+def test_walk_forward_folds():
+    end = START + timedelta(days=100)
+    folds = walk_forward_folds(
+        START, end, train=timedelta(days=30), test=timedelta(days=20)
+    )
+    assert folds == [
+        Fold(0, START, START + timedelta(days=30), START + timedelta(days=50)),
+        Fold(1, START + timedelta(days=20), START + timedelta(days=50), START + timedelta(days=70)),
+        Fold(2, START + timedelta(days=40), START + timedelta(days=70), START + timedelta(days=90)),
+    ]
+
+    anchored = walk_forward_folds(
+        START, end, train=timedelta(days=30), test=timedelta(days=20),
+        step=timedelta(days=10), anchored=True,
+    )
+    assert len(anchored) == 6
+    assert all(f.train_start == START for f in anchored)
+
+    with pytest.raises(ValueError):
+        walk_forward_folds(START, end, train=timedelta(0), test=timedelta(days=1))
+
+
+def test_fresh_folds():
+    folds = walk_forward_folds(
+        START, START + timedelta(days=100),
+        train=timedelta(days=30), test=timedelta(days=20),
+    )
+    runner = WalkForwardRunner([_get_store()], CountingProcessor, max_workers=1)
+    results = runner.run(folds)
+
+    assert [r.fold for r in results] == folds
+    for r in results:
+        # every fold replays its whole train window
+        assert r.result == (30, 20, 50, r.fold.test_end - timedelta(days=1))
+
+
+def test_parallel_folds_match_in_process():
+    folds = walk_forward_folds(
+        START, START + timedelta(days=100),
+        train=timedelta(days=10), test=timedelta(days=10),
+    )
+    store = _get_store()
+    serial = WalkForwardRunner([store], CountingProcessor, max_workers=1).run(folds)
+    pooled = WalkForwardRunner([store], CountingProcessor, max_workers=2).run(folds)
+    assert serial == pooled
+
+
+def test_carried_folds():
+    folds = walk_forward_folds(
+        START, START + timedelta(days=100),
+        train=timedelta(days=30), test=timedelta(days=20),
+    )
+    runner = WalkForwardRunner([_get_store()], CountingProcessor, carry_state=True)
+    results = runner.run(folds)
+
+    # only the first train window is replayed, later folds carry on
+    assert [r.result[:3] for r in results] == [
+        (30, 20, 50),
+        (0, 20, 70),
+        (0, 20, 90),
+    ]
+
+    overlapping = walk_forward_folds(
+        START, START + timedelta(days=100),
+        train=timedelta(days=30), test=timedelta(days=20), step=timedelta(days=10),
+    )
+    with pytest.raises(ValueError):
+        runner.run(overlapping)